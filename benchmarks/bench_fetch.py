@@ -0,0 +1,153 @@
+"""Offline benchmarks of font fetching, using a local stand-in for the font repository (see font_fetcher.testing).
+
+Reports cold fetch, warm cache hit, multi-style, batch and OCP FindFont hook latencies, so that they can be tracked
+from release to release.
+
+Usage: python benchmarks/bench_fetch.py [--latency SECONDS] [--families N] [--json OUTPUT.json]
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import font_fetcher  # noqa: E402
+from font_fetcher.repo_1001fonts import Fonts1001Repo  # noqa: E402
+from font_fetcher.testing import DEFAULT_STYLES, FakeFontRepoServer  # noqa: E402
+
+ALL_STYLES = ["Regular", "Bold", "Italic", "Bold Italic"]
+
+
+@contextmanager
+def isolated_fetcher(server: FakeFontRepoServer):
+    """Uses an empty cache directory and a Fonts1001Repo pointed to the given server while in the context."""
+    registry = font_fetcher._repo_registry()
+    original_cache_dir, original_repos = font_fetcher._CACHE_DIR, list(registry)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        font_fetcher._CACHE_DIR = Path(cache_dir)
+        registry[:] = [server.configure_repo(Fonts1001Repo())]
+        try:
+            yield
+        finally:
+            font_fetcher._CACHE_DIR = original_cache_dir
+            registry[:] = original_repos
+
+
+def timed(func: Callable, repeat: int) -> List[float]:
+    """Returns the durations (in seconds) of repeated calls."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summary(durations: List[float], unit: float = 1e-3) -> Dict[str, float]:
+    return {"median": statistics.median(durations) / unit, "min": min(durations) / unit,
+            "max": max(durations) / unit, "runs": len(durations)}
+
+
+def bench_cold_fetch(server: FakeFontRepoServer, families: List[str]) -> Dict[str, float]:
+    """Search + download + extraction of a family that is not cached."""
+    durations = []
+    for family in families:
+        with isolated_fetcher(server):
+            durations += timed(lambda: font_fetcher.fetch_font(family, "Regular"), 1)
+    return summary(durations)
+
+
+def bench_warm_hit(server: FakeFontRepoServer, family: str, repeat: int = 10000) -> Dict[str, float]:
+    """Lookup of an already cached font."""
+    with isolated_fetcher(server):
+        font_fetcher.fetch_font(family, "Regular")
+        return summary(timed(lambda: font_fetcher.fetch_font(family, "Regular"), repeat), unit=1e-6)
+
+
+def bench_multi_style(server: FakeFontRepoServer, families: List[str]) -> Dict[str, float]:
+    """All the styles of a family, fetched one after the other."""
+    durations = []
+    for family in families:
+        with isolated_fetcher(server):
+            durations += timed(lambda: [font_fetcher.fetch_font(family, style) for style in ALL_STYLES], 1)
+    return summary(durations)
+
+
+def bench_batch(server: FakeFontRepoServer, families: List[str]) -> Dict[str, float]:
+    """All the styles of all the families, fetched with fetch_fonts."""
+    requests = [(family, style) for family in families for style in ALL_STYLES]
+    with isolated_fetcher(server):
+        start = time.perf_counter()
+        results = font_fetcher.fetch_fonts(requests)
+        duration = time.perf_counter() - start
+    failed = [result for result in results if result.error is not None]
+    if failed:
+        raise RuntimeError(f"Batch fetch failed: {failed}")
+    return {"total": duration * 1e3, "fonts": len(requests), "fonts_per_second": len(requests) / duration}
+
+
+def bench_ocp_hook(server: FakeFontRepoServer, repeat: int = 1000) -> Dict[str, Dict[str, float]]:
+    """FindFont overhead of the OCP hook, for system fonts and for fonts that can not be found."""
+    try:
+        from OCP.Font import Font_FontAspect, Font_FontMgr, Font_StrictLevel
+        from OCP.TCollection import TCollection_AsciiString
+    except ImportError:
+        return {}
+    from font_fetcher.ocp import install_ocp_font_hook, uninstall_ocp_font_hook
+
+    def find_font(name: str):
+        # noinspection PyArgumentList
+        return Font_FontMgr.GetInstance_s().FindFont(TCollection_AsciiString(name), Font_StrictLevel.Font_StrictLevel_Any,
+                                                     Font_FontAspect.Font_FontAspect_Regular, False)
+
+    # noinspection PyArgumentList
+    system_fonts = Font_FontMgr.GetInstance_s().GetAvailableFonts()
+    system_font = system_fonts.First().FontName().ToCString() if system_fonts.Size() > 0 else "DejaVu Sans"
+    results = {"system_font_without_hook": summary(timed(lambda: find_font(system_font), repeat), unit=1e-6)}
+    with isolated_fetcher(server):
+        install_ocp_font_hook(renames={})
+        try:
+            results["system_font_with_hook"] = summary(timed(lambda: find_font(system_font), repeat), unit=1e-6)
+            find_font("Missing Font")  # Populates the negative cache
+            results["missing_font_with_hook"] = summary(timed(lambda: find_font("Missing Font"), repeat), unit=1e-6)
+        finally:
+            uninstall_ocp_font_hook()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated latency of each request (seconds)")
+    parser.add_argument("--families", type=int, default=8, help="number of families to fetch")
+    parser.add_argument("--archive-format", choices=["zip", "tar.gz"], default="zip")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    families = {f"Bench Family {i}": DEFAULT_STYLES for i in range(args.families)}
+    with FakeFontRepoServer(families, archive_format=args.archive_format, latency=args.latency) as server:
+        names = list(families)
+        results = {
+            "config": vars(args),
+            "cold_fetch_ms": bench_cold_fetch(server, names),
+            "warm_hit_us": bench_warm_hit(server, names[0]),
+            "multi_style_ms": bench_multi_style(server, names),
+            "batch": bench_batch(server, names),
+            "ocp_find_font_us": bench_ocp_hook(server),
+        }
+
+    for name, result in results.items():
+        if name != "config":
+            print(f"{name:16} {json.dumps(result) if result else 'skipped (OCP is not installed)'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
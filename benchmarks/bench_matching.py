@@ -0,0 +1,121 @@
+"""Micro-benchmarks of style and font name matching, comparing the indexed engines (StyleIndex and NameIndex) to the
+difflib ranking they replaced, on candidate sets of increasing size. Also reports where the two rankings disagree.
+
+Usage: python benchmarks/bench_matching.py [--repeat N] [--json OUTPUT.json]
+"""
+import argparse
+import json
+import sys
+from difflib import get_close_matches
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_fetch import summary, timed  # noqa: E402
+from font_fetcher.names import NameIndex  # noqa: E402
+from font_fetcher.style import StyleIndex, _normalize, match_style  # noqa: E402
+
+_WEIGHTS = ["Thin", "ExtraLight", "Light", "Regular", "Medium", "SemiBold", "Bold", "ExtraBold", "Black"]
+_WIDTHS = ["UltraCondensed", "ExtraCondensed", "Condensed", "SemiCondensed", "", "SemiExpanded", "Expanded"]
+_OPTICAL_SIZES = ["", "Display", "Text", "Caption"]
+
+_STYLE_QUERIES = ["Bold Italic", "SemiBold", "600", "Condensed Light", "Display Black Italic", "Book"]
+_NAME_QUERIES = ["Open Sans", "Source Code Pro", "Noto Sans CJK", "Fira Mono"]
+
+
+def difflib_match_style(style: str, available_styles: List[str]) -> str:
+    """The previous style matching: exact normalized name, otherwise the closest string."""
+    normalized = {_normalize(available): available for available in reversed(available_styles)}
+    wanted = _normalize(style)
+    if wanted in normalized:
+        return normalized[wanted]
+    return normalized[get_close_matches(wanted, normalized.keys(), n=1, cutoff=0.0)[0]]
+
+
+def difflib_sort_names(wanted_name: str, names: List[str]) -> List[str]:
+    """The previous font name ranking: all the names sorted by string similarity."""
+    by_lower = {name.lower(): name for name in names}
+    return [by_lower[name] for name in get_close_matches(wanted_name.lower(), by_lower.keys(), n=len(by_lower),
+                                                         cutoff=0.0)]
+
+
+def make_styles(count: int) -> List[str]:
+    """Returns realistic style names of a family with the given number of files (e.g., a variable font bundle)."""
+    styles = []
+    for optical_size in _OPTICAL_SIZES:
+        for width in _WIDTHS:
+            for weight in _WEIGHTS:
+                for italic in ["", "Italic"]:
+                    styles.append(" ".join(part for part in [optical_size, width, weight, italic] if part))
+    return styles[:count]
+
+
+def make_names(count: int) -> List[str]:
+    """Returns font names like the ones of search results."""
+    words = ["Open", "Sans", "Serif", "Mono", "Code", "Source", "Pro", "Noto", "CJK", "Fira", "Display", "Slab", "Hand"]
+    names = [" ".join(words[(i * step) % len(words)] for step in (1, 3, 7)[:1 + i % 3]) + f" {i}" for i in range(count)]
+    return names[:-len(_NAME_QUERIES)] + _NAME_QUERIES
+
+
+def bench_styles(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results = {}
+    for size in sizes:
+        styles = make_styles(size)
+        results[str(size)] = {
+            "difflib_us": summary(timed(lambda: [difflib_match_style(q, styles) for q in _STYLE_QUERIES], repeat),
+                                  unit=1e-6 * len(_STYLE_QUERIES)),
+            "index_cold_us": summary(timed(lambda: [StyleIndex(styles).best(q) for q in _STYLE_QUERIES], repeat),
+                                     unit=1e-6 * len(_STYLE_QUERIES)),
+            "index_warm_us": summary(timed(lambda: [match_style(q, styles) for q in _STYLE_QUERIES], repeat),
+                                     unit=1e-6 * len(_STYLE_QUERIES)),
+        }
+    return results
+
+
+def bench_names(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results = {}
+    for size in sizes:
+        names = make_names(size)
+        results[str(size)] = {
+            "difflib_us": summary(timed(lambda: [difflib_sort_names(q, names) for q in _NAME_QUERIES], repeat),
+                                  unit=1e-6 * len(_NAME_QUERIES)),
+            "index_us": summary(timed(lambda: [NameIndex(names).rank(q) for q in _NAME_QUERIES], repeat),
+                                unit=1e-6 * len(_NAME_QUERIES)),
+        }
+    return results
+
+
+def disagreements() -> List[Dict[str, str]]:
+    """Returns the style queries that the two engines resolve differently."""
+    styles = make_styles(len(_OPTICAL_SIZES) * len(_WIDTHS) * len(_WEIGHTS) * 2)
+    queries = _STYLE_QUERIES + ["Bold Oblique", "wght300", "Narrow Bold", "Heavy", "BoldIt"]
+    return [{"query": query, "difflib": difflib_match_style(query, styles), "index": match_style(query, styles)}
+            for query in queries if difflib_match_style(query, styles) != match_style(query, styles)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="number of runs of each measurement")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        "config": vars(args),
+        "match_style": bench_styles([4, 18, 126, 504], args.repeat),
+        "sort_fonts_by_name": bench_names([10, 100, 500], args.repeat),
+        "disagreements": disagreements(),
+    }
+    for benchmark in ["match_style", "sort_fonts_by_name"]:
+        for size, result in results[benchmark].items():
+            medians = ", ".join(f"{engine} {stats['median']:.1f}" for engine, stats in result.items())
+            print(f"{benchmark:18} {size:>4} candidates: {medians} (median per query)")
+    for disagreement in results["disagreements"]:
+        print(f"'{disagreement['query']}': difflib -> '{disagreement['difflib']}', index -> '{disagreement['index']}'")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Measures the startup cost of a process that only gets cache hits (e.g., most OCP renders), and checks that it does
+not load the network dependencies.
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from font_fetcher.testing import prepare_cache, run_cache_hit_process  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        prepare_cache(Path(home))
+        results = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = run_cache_hit_process(Path(home))
+            result["process"] = time.perf_counter() - start
+            results.append(result)
+
+    import_and_hit = [r["elapsed"] * 1000 for r in results]
+    process = [r["process"] * 1000 for r in results]
+    print(f"import + cache hit: median {statistics.median(import_and_hit):.1f} ms, "
+          f"min {min(import_and_hit):.1f} ms ({args.runs} runs)")
+    print(f"whole process:      median {statistics.median(process):.1f} ms, min {min(process):.1f} ms")
+    network_modules = sorted({m for r in results for m in r["network_modules"]})
+    print(f"network modules loaded: {network_modules or 'none'}")
+    return 1 if network_modules else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
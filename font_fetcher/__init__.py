@@ -1,10 +1,25 @@
+import importlib
 import os
 import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.cache_lock import cache_lock
+from font_fetcher.cache_meta import FontMetaIndex
+from font_fetcher.cache_negative import NegativeCache
+from font_fetcher.cache_prune import DEFAULT_MAX_AGE, DEFAULT_MAX_SIZE, CacheStats, cache_stats as _cache_stats, \
+    prune_cache as _prune_cache
+from font_fetcher.cache_search import SearchCache
+from font_fetcher.fetch_common import Fetcher, RepoSearch
+from font_fetcher.metrics import fetch_metrics
 from font_fetcher.misc import logger
-from font_fetcher.repo_registry import repo_registry
+from font_fetcher.repo import Font, FontRepo, NotModifiedError
+from font_fetcher.repo_stats import DEFAULT_REPO_TIMEOUT, RepoStats, repo_stats_table
+from font_fetcher.style import match_style
 
 
 def _get_cache_dir() -> Path:
@@ -16,55 +31,353 @@ def _get_cache_dir() -> Path:
         return Path.home() / ".cache" / "fontfetcher"
 
 
-_CACHE_DIR = _get_cache_dir()
-_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+_CACHE_DIR = _get_cache_dir()  # Only created when something is cached
+
+
+_registry: Optional[List[FontRepo]] = None
+_registry_lock = Lock()
+
+
+def _repo_registry() -> List[FontRepo]:
+    """Returns the registered repositories, importing them (and their network dependencies) on first use: the local
+    mirrors (directories or pack files) listed in FONT_FETCHER_LOCAL_REPOS, then 1001fonts.com. Local repositories are
+    searched before the others wherever they are registered (see FontRepo.local)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from font_fetcher.repo_1001fonts import Fonts1001Repo
+                from font_fetcher.repo_local import LocalFontRepo
+                paths = os.getenv("FONT_FETCHER_LOCAL_REPOS", "").split(os.pathsep)
+                _registry = [LocalFontRepo(path) for path in paths if path] + [Fonts1001Repo()]
+    return _registry
+
+
+def __getattr__(name: str):
+    if name == "repo_registry":  # Backwards compatibility, the registry is no longer imported eagerly
+        return _repo_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Load the (lazy) legacy submodule of the same name now and drop the attribute binding it, as importing it later would
+# shadow the registry served by __getattr__
+importlib.import_module("font_fetcher.repo_registry")
+del globals()["repo_registry"]
+
+
+def _cache_index() -> CacheIndex:
+    """Returns the (lazily loaded) index of the cache directory."""
+    return CacheIndex.for_dir(_CACHE_DIR)
+
+
+def _font_meta() -> FontMetaIndex:
+    """Returns the (lazily loaded) metadata of the cached fonts."""
+    return FontMetaIndex.for_dir(_CACHE_DIR)
+
+
+def _negative_cache() -> NegativeCache:
+    """Returns the (lazily loaded) cache of fonts that could not be found."""
+    return NegativeCache.for_dir(_CACHE_DIR)
+
+
+def set_negative_cache_ttl(ttl: float):
+    """Sets how long (in seconds) fonts that could not be found are remembered. Zero disables the negative cache."""
+    _negative_cache().ttl = ttl
+
+
+def invalidate_negative_cache(font_name: Optional[str] = None, style: Optional[str] = None,
+                              exact: Optional[bool] = None) -> int:
+    """Forgets that the matching fonts (all by default) could not be found, so that they are searched for again.
+    Returns the number of forgotten entries."""
+    return _negative_cache().invalidate(font_name, style, exact)
+
+
+_cache_max_size = DEFAULT_MAX_SIZE
+_cache_max_age = DEFAULT_MAX_AGE
+
+
+def set_cache_limits(max_size: Optional[int] = None, max_age: Optional[float] = None):
+    """Sets the maximum size (in bytes) of the cached fonts and the maximum time (in seconds) since each of them was last
+    used, None meaning no limit. The least recently used fonts are evicted whenever new fonts are cached."""
+    global _cache_max_size, _cache_max_age
+    _cache_max_size, _cache_max_age = max_size, max_age
+
+
+def cache_stats() -> CacheStats:
+    """Returns statistics about the cached fonts."""
+    return _cache_stats(_CACHE_DIR)
+
+
+def prune_cache(max_size: Optional[int] = None, max_age: Optional[float] = None, dry_run: bool = False) -> List[Path]:
+    """Removes the least recently used fonts until the cache is within the given limits (by default, the ones set with
+    set_cache_limits), and returns the removed font files."""
+    return _prune_cache(_CACHE_DIR, _cache_max_size if max_size is None else max_size,
+                        _cache_max_age if max_age is None else max_age, dry_run=dry_run)
+
+
+def _search_cache() -> SearchCache:
+    """Returns the (lazily loaded) cache of search results."""
+    return SearchCache.for_dir(_CACHE_DIR)
+
+
+def invalidate_search_cache():
+    """Forgets all cached search results, so that repositories are searched again."""
+    _search_cache().clear()
+
+
+_repo_timeout = DEFAULT_REPO_TIMEOUT
+
+
+def set_repo_timeout(timeout: float):
+    """Sets how long (in seconds) to wait for the search of each repository before giving up on it. Zero or negative
+    waits for as long as the HTTP timeouts allow."""
+    global _repo_timeout
+    _repo_timeout = timeout
+
+
+def repo_stats(repo: FontRepo) -> RepoStats:
+    """Returns the search statistics (latency, hit rate, failures) of a repository in this process."""
+    return repo_stats_table.get(repo)
 
 
 def fetch_font(font_name: str, style: str, exact: bool = True) -> Path:
     """Fetches font from cache or remote if not cached."""
-    cached_font = fetch_font_cached(font_name, style)
+    cached_font = fetch_font_cached(font_name, style, exact)
     if cached_font is not None:
+        fetch_metrics.increment("cache_hits")
         return cached_font
+    fetch_metrics.increment("cache_misses")
     return fetch_font_remote(font_name, style, exact)
 
 
-def _cached_basename(font_name: str, style: str, ext: str) -> str:
-    """Generates a cached font basename based on font name, style, and extension."""
-    return f"{font_name}-{style}.{ext.lower()}"
-
+def fetch_font_cached(font_name: str, style: str = "Regular", exact: bool = True) -> Optional[Path]:
+    """Fetches font from cache if available.
 
-def fetch_font_cached(font_name: str, style: str = "Regular") -> Optional[Path]:
-    """Fetches font from cache if available."""
+    Fonts cached with other spellings of the name (or, if not exact, with the same words in another order) are also
+    found, by the metadata read from the cached fonts (see FontMetaIndex)."""
     logger.debug(f"Looking for cached font '{font_name}' with style '{style}'")
-    for cached_basename in [_cached_basename(font_name, style, "ttf"), _cached_basename(font_name, style, "otf")]:
-        if cached_basename in os.listdir(_CACHE_DIR):
-            cached_path = _CACHE_DIR / cached_basename
-            if cached_path.exists():
-                logger.debug(f"Found cached font: {cached_path}")
+    index = _cache_index()
+    cached_path = index.lookup(font_name, style)
+    if cached_path is None:
+        # Other styles of the family may have been downloaded, serve the closest one as done for remote fonts
+        family = index.family(font_name)
+        if family is not None:
+            family_style = match_style(style, list(family.keys()))
+            logger.debug(f"Style '{style}' resolved to '{family_style}' from cached family '{font_name}'")
+            cached_path = family[family_style]
+        else:
+            cached_path = _font_meta().resolve(font_name, style)
+            if cached_path is None:
+                cached_path = None if exact else _font_meta().resolve(font_name, style, exact=False)
+                if cached_path is not None:  # Not indexed, so that it is only served when not exact
+                    logger.debug(f"Font '{font_name}' with style '{style}' resolved to another cached family")
                 return cached_path
-    return None
+            logger.debug(f"Font '{font_name}' with style '{style}' resolved from the metadata of cached fonts")
+        index.add(font_name, style, cached_path)
+    logger.debug(f"Found cached font: {cached_path}")
+    return cached_path
+
+
+def cached_fonts() -> Dict[str, Dict[str, Path]]:
+    """Returns all the cached font files, grouped by font name and then by style."""
+    return _cache_index().fonts()
+
+
+def export_cache_pack(pack_path: Path) -> int:
+    """Writes all the cached fonts to a pack file, which can be imported (see import_cache_pack) or served by a
+    font_fetcher.repo_local.LocalFontRepo elsewhere. Returns the number of exported font files."""
+    from font_fetcher.repo_local import write_pack
+    index = _cache_index()
+    fonts = index.fonts()
+    complete = set()
+    for font_name in fonts:
+        family = index.family(font_name)
+        if family is not None:  # Only export the styles of the family, not the requested styles resolved to them
+            fonts[font_name] = family
+            complete.add(font_name)
+    return write_pack(Path(pack_path), fonts, complete)
+
+
+def import_cache_pack(pack_path: Path) -> int:
+    """Caches all the fonts of a pack file (or directory) written by export_cache_pack, skipping fully cached families,
+    so that they can be used without network access. Returns the number of imported families."""
+    from font_fetcher.repo_local import LocalFontRepo
+    repo = LocalFontRepo(Path(pack_path))
+    fetcher = Fetcher.current()
+    imported = 0
+    for font in repo.fonts():
+        with cache_lock(fetcher.cache_dir, fetcher.lock_key(font.name)):
+            if all(fetcher.cache_index().lookup(font.name, style) is not None for style in font.styles):
+                logger.debug(f"Font '{font.name}' is already cached, skipping")
+                continue
+            with fetcher.download_dir() as tmp_dir:
+                try:
+                    fetcher.cache_family(font.name, repo.download_font_family(Path(tmp_dir), font))
+                except NotImplementedError:
+                    for style in font.styles:
+                        fetcher.cache_single(font.name, style, repo.download_font(Path(tmp_dir), font, style))
+            imported += 1
+    logger.info(f"Imported {imported} font families from {pack_path}")
+    return imported
+
+
+def _search_repos(search: RepoSearch) -> Optional[Tuple[FontRepo, List[Font]]]:
+    """Runs the searches of each round of a RepoSearch concurrently in worker threads, abandoning the ones that are
+    still running once the search is over, and returns its result."""
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    for repos in search.rounds():
+        executor = ThreadPoolExecutor(max_workers=len(repos), thread_name_prefix="font_fetcher-search")
+        try:
+            pending = {executor.submit(search.fetcher.search_font, repo, search.font_name): repo for repo in repos}
+            deadline = search.deadline()
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    search.timed_out(list(pending.values()))
+                    break
+                for future in done:
+                    repo = pending.pop(future)
+                    error = future.exception()
+                    if search.add(repo, None if error is not None else future.result(), error):
+                        return search.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)  # Searches still running are abandoned
+    return search.result()
 
 
 def fetch_font_remote(font_name: str, style: str = "Regular", exact: bool = True) -> Path:
-    """"""
+    """Fetches font from the registered repositories (searched concurrently, see RepoSearch) and caches it (along
+    with all other styles of its family, if the repository supports it).
+
+    Concurrent fetches of the same family by other threads or processes sharing the cache directory are waited for and
+    their results reused."""
     logger.debug(f"Fetching font '{font_name}' with style '{style}'")
-    for repo in repo_registry:
-        fonts = repo.search_font(font_name)
-        if len(fonts) == 0 or (exact and fonts[0].name.lower() != font_name.lower()):
-            logger.debug(f"Font '{font_name}' not found (exactly) in repository: {repo.__class__.__name__}")
-            continue
+    fetcher = Fetcher.current()
+    fetcher.raise_if_known_missing(font_name, style, exact)
+    with fetch_metrics.timed("fetch"), cache_lock(fetcher.cache_dir, fetcher.lock_key(font_name)):
+        cached_path = fetcher.fetched_meanwhile(font_name, style, exact)
+        if cached_path is not None:
+            return cached_path
+
+        found = _search_repos(RepoSearch(fetcher, font_name, exact))
+        if found is None:
+            raise fetcher.not_found(font_name, style, exact)
+        repo, fonts = found
+        source = fetcher.font_source(repo, fonts[0])
+        cached_path = fetcher.cache_known_family(font_name, style, source)
+        if cached_path is not None:
+            return cached_path
 
-        downloaded = repo.download_font(_CACHE_DIR, fonts[0], style)
-        # Cache with user-provided name and style in case they are not exact matches
-        cached_path = _CACHE_DIR / _cached_basename(font_name, style, downloaded.suffix.lower()[1:])
-        if downloaded != cached_path:
-            logger.debug(f"Moving downloaded font from {downloaded} to {cached_path}")
-            if cached_path.exists():
-                logger.warning(f"Cached font already exists, removing: {cached_path}")
-                cached_path.unlink()
-            downloaded.rename(cached_path)
+        # Download all styles at once if possible, so that other styles of the family can be served from the cache
+        with fetcher.download_dir() as tmp_dir, fetcher.recording_validators():
+            try:
+                font_files = repo.download_font_family(Path(tmp_dir), fonts[0])
+            except NotImplementedError:
+                cached_path = fetcher.cache_single(font_name, style, repo.download_font(Path(tmp_dir), fonts[0], style))
+            else:
+                cached_path = fetcher.cache_downloaded_family(font_name, style, font_files, source)
 
         logger.debug(f"Font cached to: {cached_path}")
         return cached_path
 
-    raise FileNotFoundError(f"Font '{font_name}' with style '{style}' not found in any registered repositories.")
+
+def refresh_cache(font_names: Optional[Iterable[str]] = None) -> List[str]:
+    """Refreshes the cached families downloaded as a whole from repositories (all by default, or the given font names),
+    searching and downloading them again with conditional requests (see font_fetcher.repo_common.recording_validators),
+    so that unchanged searches and archives only cost a few bytes. Changed families replace the cached ones (under all
+    names).
+
+    Returns the names of the families that changed. Families that can not be refreshed are skipped with a warning."""
+    wanted = None if font_names is None else set(font_names)
+    repos = {}
+    for repo in reversed(_repo_registry()):  # The first registered repository wins
+        repos[repo.__class__.__name__] = repo  # Sources recorded before repositories had identities
+        repos[repo.identity] = repo
+    refreshed = []
+    for source, font_name in _cache_index().sources().items():
+        if wanted is not None and font_name not in wanted:
+            continue
+        repo_name, _, repo_font_name = source.partition("\x1f")
+        repo = repos.get(repo_name)
+        if repo is None:
+            logger.warning(f"Can not refresh font '{font_name}': repository {repo_name} is not registered")
+            continue
+        try:
+            if _refresh_family(repo, repo_font_name, font_name, source):
+                refreshed.append(font_name)
+        except Exception as e:
+            logger.warning(f"Could not refresh font '{font_name}' from {repo_name}: {e}")
+    logger.info(f"Refreshed {len(refreshed)} cached font families")
+    return refreshed
+
+
+def _refresh_family(repo: FontRepo, repo_font_name: str, font_name: str, source: str) -> bool:
+    """Downloads a cached family again unless its repository reports that it did not change, returning whether any of
+    its files changed."""
+    fetcher = Fetcher.current()
+    with cache_lock(fetcher.cache_dir, fetcher.lock_key(font_name)):
+        font = next((font for font in fetcher.search_font(repo, repo_font_name, refresh=True)
+                     if font.name == repo_font_name), None)
+        if font is None:
+            raise FileNotFoundError(f"Font '{repo_font_name}' is no longer found")
+        with fetcher.download_dir() as tmp_dir:
+            try:
+                with fetcher.recording_validators(revalidate=True):
+                    font_files = repo.download_font_family(Path(tmp_dir), font)
+            except NotModifiedError:
+                logger.debug(f"Font '{font_name}' did not change in {repo.__class__.__name__}")
+                return False
+            previous = _cache_index().family(font_name)
+            fetcher.cache_family(font_name, font_files, source)  # Identical files are deduplicated, see store_blob
+    return _cache_index().family(font_name) != previous
+
+
+@dataclass
+class FetchResult:
+    """The requested font name."""
+    font_name: str
+
+    """The requested style."""
+    style: str
+
+    """The path to the fetched font file (None if it could not be fetched)."""
+    path: Optional[Path] = None
+
+    """The error that prevented fetching the font (None if it was fetched)."""
+    error: Optional[Exception] = None
+
+
+def fetch_fonts(font_requests: Iterable[Tuple[str, str]], exact: bool = True,
+                max_workers: int = 8) -> List[FetchResult]:
+    """Fetches many (font name, style) pairs from cache or remote, returning a result for each of them (in order).
+
+    Requests for the same family are fetched together, so that each family is searched and downloaded only once, while
+    different families are fetched concurrently by up to max_workers threads."""
+    results = [FetchResult(font_name, style) for font_name, style in font_requests]
+    families: Dict[str, List[FetchResult]] = {}
+    for result in results:
+        families.setdefault(result.font_name, []).append(result)
+
+    def fetch_family(family_results: List[FetchResult]):
+        family_error = None
+        for result in family_results:
+            # Once the family failed to be fetched, only try the cache for the remaining styles
+            try:
+                if family_error is None:
+                    result.path = fetch_font(result.font_name, result.style, exact)
+                else:
+                    result.path = fetch_font_cached(result.font_name, result.style, exact)
+                    if result.path is None:
+                        result.error = family_error
+            except Exception as e:
+                logger.debug(f"Could not fetch font '{result.font_name}' with style '{result.style}': {e}")
+                result.error = family_error = e
+
+    if families:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(families)),
+                                thread_name_prefix="font_fetcher") as executor:
+            list(executor.map(fetch_family, families.values()))
+    return results
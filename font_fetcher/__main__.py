@@ -0,0 +1,130 @@
+import argparse
+import logging
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from font_fetcher import cache_stats, export_cache_pack, fetch_fonts, import_cache_pack, prune_cache, refresh_cache
+from font_fetcher.metrics import fetch_metrics
+from font_fetcher.misc import parse_age, parse_size
+
+
+def _parse_font_spec(spec: str) -> Tuple[str, str]:
+    """Parses a "Font Name[:Style]" command-line font specification."""
+    font_name, _, style = spec.partition(":")
+    return font_name.strip(), style.strip() or "Regular"
+
+
+def _prefetch(args: argparse.Namespace) -> int:
+    specs = list(args.fonts)
+    for file in args.file or []:
+        with open(file, "r", encoding="utf-8") as f:
+            specs.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+    results = fetch_fonts([_parse_font_spec(spec) for spec in specs], exact=not args.inexact,
+                          max_workers=args.workers)
+    failed = 0
+    for result in results:
+        if result.error is None:
+            print(f"{result.font_name}:{result.style}\t{result.path}")
+        else:
+            failed += 1
+            print(f"{result.font_name}:{result.style}\tERROR: {result.error}", file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(fetch_metrics.to_prometheus())
+    return 1 if failed else 0
+
+
+def _format_size(size: float) -> str:
+    for unit in ["B", "KiB", "MiB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _format_time(timestamp) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp is not None else "-"
+
+
+def _stats(_args: argparse.Namespace) -> int:
+    stats = cache_stats()
+    print(f"Cache directory: {stats.cache_dir}")
+    print(f"Fonts:           {stats.files}")
+    print(f"Size:            {_format_size(stats.size)}")
+    print(f"Oldest use:      {_format_time(stats.oldest_access)}")
+    print(f"Newest use:      {_format_time(stats.newest_access)}")
+    return 0
+
+
+def _prune(args: argparse.Namespace) -> int:
+    removed = prune_cache(max_size=args.max_size, max_age=args.max_age, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    for path in removed:
+        print(f"{verb}: {path}")
+    print(f"{verb} {len(removed)} fonts ({_format_size(cache_stats().size)} cached)")
+    return 0
+
+
+def _export(args: argparse.Namespace) -> int:
+    files = export_cache_pack(args.pack)
+    print(f"Exported {files} font files to {args.pack}")
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    families = import_cache_pack(args.pack)
+    print(f"Imported {families} font families ({_format_size(cache_stats().size)} cached)")
+    return 0
+
+
+def _refresh(args: argparse.Namespace) -> int:
+    refreshed = refresh_cache(args.fonts or None)
+    for font_name in refreshed:
+        print(f"Refreshed: {font_name}")
+    print(f"Refreshed {len(refreshed)} font families ({_format_size(cache_stats().size)} cached)")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line interface to manage the font cache."""
+    parser = argparse.ArgumentParser(prog="font-fetcher", description="Fetch (and cache) fonts.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prefetch = commands.add_parser("prefetch", help="fetch fonts into the cache (e.g., at container build time)")
+    prefetch.add_argument("fonts", nargs="*", metavar="FONT[:STYLE]", help='e.g., "Open Sans:Bold" (default: Regular)')
+    prefetch.add_argument("-f", "--file", action="append", help="file with one FONT[:STYLE] per line")
+    prefetch.add_argument("--inexact", action="store_true", help="accept the closest font name if not found exactly")
+    prefetch.add_argument("-j", "--workers", type=int, default=8, help="maximum number of concurrent fetches")
+    prefetch.add_argument("--metrics", metavar="FILE", help="write fetch metrics to a file (Prometheus text format)")
+    prefetch.set_defaults(func=_prefetch)
+
+    stats = commands.add_parser("stats", help="show statistics about the cached fonts")
+    stats.set_defaults(func=_stats)
+
+    prune = commands.add_parser("prune", help="remove the least recently used fonts from the cache")
+    prune.add_argument("--max-size", type=parse_size, help='maximum cache size, e.g., "500M" (default: configured)')
+    prune.add_argument("--max-age", type=parse_age, help='maximum time since last use, e.g., "30d" (default: configured)')
+    prune.add_argument("-n", "--dry-run", action="store_true", help="only show what would be removed")
+    prune.set_defaults(func=_prune)
+
+    export = commands.add_parser("export", help="write all the cached fonts to a pack file")
+    export.add_argument("pack", help="path of the pack file to write")
+    export.set_defaults(func=_export)
+
+    import_ = commands.add_parser("import", help="cache all the fonts of a pack file (e.g., without internet)")
+    import_.add_argument("pack", help="path of the pack file (or directory) to read")
+    import_.set_defaults(func=_import)
+
+    refresh = commands.add_parser("refresh", help="download the cached families again if they changed (conditionally)")
+    refresh.add_argument("fonts", nargs="*", metavar="FONT", help="font names to refresh (default: all)")
+    refresh.set_defaults(func=_refresh)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
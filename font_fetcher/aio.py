@@ -0,0 +1,108 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from font_fetcher import fetch_font_cached
+from font_fetcher.cache_lock import cache_lock_async
+from font_fetcher.fetch_common import Fetcher, RepoSearch
+from font_fetcher.metrics import fetch_metrics
+from font_fetcher.misc import logger
+from font_fetcher.repo import Font, FontRepo
+from font_fetcher.repo_stats import repo_stats_table
+
+
+async def fetch_font_async(font_name: str, style: str, exact: bool = True) -> Path:
+    """Async variant of fetch_font: fetches font from cache or remote if not cached, without blocking the event loop
+    on network requests or cache lookups and updates (so that many fonts can be fetched concurrently by a single event
+    loop)."""
+    cached_font = await asyncio.to_thread(fetch_font_cached, font_name, style, exact)
+    if cached_font is not None:
+        fetch_metrics.increment("cache_hits")
+        return cached_font
+    fetch_metrics.increment("cache_misses")
+    return await fetch_font_remote_async(font_name, style, exact)
+
+
+async def _search_font_async(fetcher: Fetcher, repo: FontRepo, font_name: str) -> List[Font]:
+    """Async variant of Fetcher.search_font."""
+    fonts = await asyncio.to_thread(fetcher.cached_search, repo, font_name)
+    if fonts is None:
+        start = time.perf_counter()
+        try:
+            with fetcher.recording_validators():
+                fonts = await repo.search_font_async(font_name)
+        except Exception:
+            repo_stats_table.record_failure(repo)
+            raise
+        await asyncio.to_thread(fetcher.searched, repo, font_name, fonts, time.perf_counter() - start)
+    return fonts
+
+
+async def _search_repos_async(search: RepoSearch) -> Optional[Tuple[FontRepo, List[Font]]]:
+    """Async variant of font_fetcher._search_repos, cancelling the searches that are no longer needed."""
+    for repos in search.rounds():
+        pending = {asyncio.ensure_future(_search_font_async(search.fetcher, repo, search.font_name)): repo
+                   for repo in repos}
+        deadline = search.deadline()
+        try:
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    search.timed_out(list(pending.values()))
+                    break
+                for task in done:
+                    repo = pending.pop(task)
+                    error = task.exception()
+                    if search.add(repo, None if error is not None else task.result(), error):
+                        return search.result()
+        finally:
+            for task in pending:
+                task.cancel()
+    return search.result()
+
+
+async def fetch_font_remote_async(font_name: str, style: str = "Regular", exact: bool = True) -> Path:
+    """Async variant of fetch_font_remote, using the async methods of the registered repositories. The steps that
+    update the cache directory (moving the downloaded files, updating the manifests and evicting old fonts) run in
+    worker threads."""
+    logger.debug(f"Fetching font '{font_name}' with style '{style}' (async)")
+    fetcher = Fetcher.current()
+    await asyncio.to_thread(fetcher.raise_if_known_missing, font_name, style, exact)
+    with fetch_metrics.timed("fetch"):
+        return await _fetch_font_remote_locked_async(fetcher, font_name, style, exact)
+
+
+async def _fetch_font_remote_locked_async(fetcher: Fetcher, font_name: str, style: str, exact: bool) -> Path:
+    async with cache_lock_async(fetcher.cache_dir, fetcher.lock_key(font_name)):
+        cached_path = await asyncio.to_thread(fetcher.fetched_meanwhile, font_name, style, exact)
+        if cached_path is not None:
+            return cached_path
+
+        found = await _search_repos_async(RepoSearch(fetcher, font_name, exact))
+        if found is None:
+            raise await asyncio.to_thread(fetcher.not_found, font_name, style, exact)
+        repo, fonts = found
+        source = fetcher.font_source(repo, fonts[0])
+        cached_path = await asyncio.to_thread(fetcher.cache_known_family, font_name, style, source)
+        if cached_path is not None:
+            return cached_path
+
+        # Download all styles at once if possible, so that other styles of the family can be served from the cache
+        tmp_dir = await asyncio.to_thread(fetcher.download_dir)
+        try:
+            with fetcher.recording_validators():
+                try:
+                    font_files = await repo.download_font_family_async(Path(tmp_dir.name), fonts[0])
+                except NotImplementedError:
+                    downloaded = await repo.download_font_async(Path(tmp_dir.name), fonts[0], style)
+                    cached_path = await asyncio.to_thread(fetcher.cache_single, font_name, style, downloaded)
+                else:
+                    cached_path = await asyncio.to_thread(fetcher.cache_downloaded_family, font_name, style,
+                                                          font_files, source)
+        finally:
+            await asyncio.to_thread(tmp_dir.cleanup)
+
+        logger.debug(f"Font cached to: {cached_path}")
+        return cached_path
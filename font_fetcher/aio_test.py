@@ -0,0 +1,27 @@
+import asyncio
+
+from font_fetcher.aio import fetch_font_async
+from font_fetcher.testing import FakeFamilyRepo
+
+
+def test_fetch_font_async(fake_repo: FakeFamilyRepo):
+    """Test that fonts can be fetched concurrently from an event loop."""
+
+    async def fetch_all():
+        return await asyncio.gather(fetch_font_async("Fake Sans", "Bold"), fetch_font_async("Fake Sans", "Italic"))
+
+    bold, italic = asyncio.run(fetch_all())
+    assert bold.read_bytes() == b"Bold"
+    assert italic.read_bytes() == b"Italic"
+    assert fake_repo.downloads == 1, "Concurrent fetches of the same family should wait for a single download"
+
+
+def test_fetch_font_async_many(fake_repo: FakeFamilyRepo):
+    """Test that more concurrent fetches of the same family than worker threads do not exhaust them while waiting."""
+
+    async def fetch_all():
+        fetches = [fetch_font_async("Fake Sans", "Bold") for _ in range(64)]
+        return await asyncio.wait_for(asyncio.gather(*fetches), timeout=10)
+
+    assert {path.read_bytes() for path in asyncio.run(fetch_all())} == {b"Bold"}
+    assert fake_repo.downloads == 1
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from font_fetcher.misc import logger
+
+BLOBS_DIR = "blobs"
+"""Subdirectory of the cache directory where font files are stored by content hash."""
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_blob(cache_dir: Path, font_file: Path) -> Path:
+    """Moves a font file into the content-addressed storage of the cache directory and returns its new path.
+
+    If an identical font is already stored, the file is discarded and the stored one is returned (marked as used), so
+    that fonts fetched under several names (or fetched again) only use disk space once."""
+    blob_path = cache_dir / BLOBS_DIR / f"{_file_digest(font_file)}{font_file.suffix.lower()}"
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+    if blob_path.exists():
+        logger.debug(f"Font '{font_file.name}' is already stored, deduplicating: {blob_path}")
+        font_file.unlink()
+        now = time.time()
+        os.utime(blob_path, (now, now))
+    else:
+        font_file.replace(blob_path)
+    return blob_path
+
+
+def blob_ref(cache_dir: Path, path: Path) -> str:
+    """The reference to a cached font file recorded in the manifests: its path relative to the cache directory."""
+    return path.relative_to(cache_dir).as_posix()
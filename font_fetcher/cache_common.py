@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
+
+from font_fetcher.cache_lock import cache_lock
+from font_fetcher.misc import logger
+
+
+def load_json_manifest(path: Path, version: int) -> Optional[dict]:
+    """Loads a versioned JSON manifest from the cache directory, returning None if it does not exist.
+
+    Raises ValueError if the manifest is corrupted or has an unsupported version."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        raise ValueError(str(e)) from e
+    if not isinstance(data, dict) or data.get("version") != version or not isinstance(data.get("entries"), dict):
+        raise ValueError(f"unsupported manifest format: {path}")
+    return data
+
+
+def save_json_manifest(path: Path, version: int, data: dict):
+    """Atomically saves a versioned JSON manifest to the cache directory (if it exists)."""
+    if not path.parent.is_dir():
+        return  # Nothing cached yet
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": version, **data}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def manifest_mtime_ns(path: Path) -> Optional[int]:
+    """Returns the modification time of a manifest, used to detect changes made by other processes."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class JsonManifest:
+    """Base class for the persistent JSON manifests of a cache directory.
+
+    Manifests are loaded once per process and reloaded when other processes modify them. Modifications are applied to
+    the latest version while holding a cross-process lock, and saved atomically. Subclasses hold the loaded data in
+    their own attributes and must hold self._lock while accessing them."""
+
+    basename: str
+    version: int
+
+    _instances: Dict[Tuple[type, Path], "JsonManifest"] = {}
+    _instances_lock = Lock()
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.path = cache_dir / self.basename
+        self._lock = Lock()
+        self._loaded = False
+        self._loaded_mtime_ns: Optional[int] = None
+
+    @classmethod
+    def for_dir(cls, cache_dir: Path):
+        """Returns the shared instance for the given cache directory."""
+        with JsonManifest._instances_lock:
+            instance = JsonManifest._instances.get((cls, cache_dir))
+            if instance is None:
+                instance = JsonManifest._instances[(cls, cache_dir)] = cls(cache_dir)
+            return instance
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        """Sets the attributes from the loaded data, which is None if the manifest is missing or corrupted.
+        Returns whether the manifest should be saved (e.g., if it was rebuilt)."""
+        raise NotImplementedError
+
+    def _to_data(self) -> dict:
+        """Returns the data to save (which must contain a dict of "entries")."""
+        raise NotImplementedError
+
+    def _ensure_loaded(self, reload_if_changed: bool = False):
+        """Loads the manifest if not loaded yet (or if it was modified by another process, if requested)."""
+        if not self._loaded or (reload_if_changed and self._manifest_changed()):
+            if self._load() and self.cache_dir.is_dir():
+                with cache_lock(self.cache_dir, self.basename):
+                    self._save()
+
+    def _update(self, mutate: Callable[[], bool]):
+        """Applies a mutation (which returns whether anything changed) to the latest version of the manifest and saves
+        it, locking the manifest meanwhile so that changes made by other processes are kept."""
+        with cache_lock(self.cache_dir, self.basename):
+            if not self._loaded or self._manifest_changed():
+                self._load()
+            if mutate():
+                self._save()
+
+    def _manifest_changed(self) -> bool:
+        mtime_ns = manifest_mtime_ns(self.path)
+        return mtime_ns is not None and mtime_ns != self._loaded_mtime_ns
+
+    def _load(self) -> bool:
+        self._loaded_mtime_ns = manifest_mtime_ns(self.path)
+        try:
+            data = load_json_manifest(self.path, self.version)
+        except ValueError as e:  # Also raised for invalid JSON
+            logger.warning(f"Cache manifest is corrupted ({e}), discarding: {self.path}")
+            data = None
+        self._loaded = True
+        return self._from_data(data)
+
+    def _save(self):
+        if self.cache_dir.is_dir():
+            save_json_manifest(self.path, self.version, self._to_data())
+            self._loaded_mtime_ns = manifest_mtime_ns(self.path)
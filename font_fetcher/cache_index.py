@@ -0,0 +1,209 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from font_fetcher.cache_blobs import BLOBS_DIR, blob_ref
+from font_fetcher.cache_common import JsonManifest
+from font_fetcher.font_info import FONT_SUFFIXES, read_font_info
+from font_fetcher.misc import logger
+
+_TOUCH_INTERVAL = 60 * 60  # Resolution (in seconds) of the last use of cached fonts
+
+
+class CacheIndex(JsonManifest):
+    """Persistent index of a cache directory, mapping cached (font name, style) keys to font files. It also remembers
+    all the styles of each family that was downloaded as a whole, so that other styles can be served locally, and the
+    repository font each family was downloaded from, so that fetching it under another name does not download it again.
+
+    Font files are referenced by their path relative to the cache directory: content-addressed blobs (see
+    font_fetcher.cache_blobs) shared by all the keys of the same font, or files named after their key (older caches).
+
+    The on-disk manifest is loaded once per process into a dict, so that cache hits do not need to scan the directory.
+    If the manifest is missing or corrupted, it is rebuilt from the contents of the cache directory: blobs are indexed
+    by the family and style read from the fonts themselves, older files by their names."""
+
+    basename = "index.json"
+    version = 2
+
+    def __init__(self, cache_dir: Path):
+        super().__init__(cache_dir)
+        self._entries: Dict[str, dict] = {}
+        self._families: Dict[str, Dict[str, str]] = {}
+        self._sources: Dict[str, str] = {}  # Repository font -> font name of its family
+
+    @staticmethod
+    def key(font_name: str, style: str) -> str:
+        """Generates the index key for a font name and style (the cached basename without extension)."""
+        return f"{font_name}-{style}"
+
+    def lookup(self, font_name: str, style: str) -> Optional[Path]:
+        """Returns the path of the cached font, or None if it is not cached."""
+        key = self.key(font_name, style)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is None and self._manifest_changed():
+                logger.debug(f"Cache index changed on disk, reloading: {self.path}")
+                self._ensure_loaded(reload_if_changed=True)
+                entry = self._entries.get(key)
+            if entry is None:
+                return None
+            path = self.cache_dir / entry["file"]
+            try:
+                last_use = os.stat(path).st_mtime
+            except FileNotFoundError:
+                logger.debug(f"Cached font vanished, removing from index: {path}")
+                self._update(lambda: self._entries.get(key) == entry and self._entries.pop(key) is not None)
+                return None
+            now = time.time()
+            if now - last_use > _TOUCH_INTERVAL:  # Track the last use (for LRU eviction) without writing on every hit
+                os.utime(path, (now, now))
+            return path
+
+    def add(self, font_name: str, style: str, path: Path):
+        """Records a cached font file (which must live in the cache directory) for the given font name and style."""
+
+        def mutate():
+            self._entries[self.key(font_name, style)] = {"file": blob_ref(self.cache_dir, path)}
+            return True
+
+        with self._lock:
+            self._update(mutate)
+
+    def add_family(self, font_name: str, styles: Dict[str, Path], source: Optional[str] = None):
+        """Records all the cached font files of a family (by style), also indexing each of them by its style. The source
+        identifies the repository font the family was downloaded from (see source_family).
+
+        If a family was already downloaded from the same source (e.g., it is being refreshed), all the references to its
+        files (under any name) are replaced by the new files of the same styles."""
+
+        def mutate():
+            files = {style: blob_ref(self.cache_dir, path) for style, path in styles.items()}
+            previous = self._families.get(self._sources.get(source), {}) if source is not None else {}
+            replaced = {file: files[style] for style, file in previous.items() if style in files}
+            if replaced:
+                for entry in self._entries.values():
+                    entry["file"] = replaced.get(entry["file"], entry["file"])
+                for family in self._families.values():
+                    family.update({style: replaced[file] for style, file in family.items() if file in replaced})
+            for style, file in files.items():
+                self._entries[self.key(font_name, style)] = {"file": file}
+            self._families[font_name] = files
+            if source is not None:
+                self._sources[source] = font_name
+            return True
+
+        with self._lock:
+            self._update(mutate)
+
+    def family(self, font_name: str) -> Optional[Dict[str, Path]]:
+        """Returns the cached font files of a family that was downloaded as a whole (by style), or None if unknown."""
+        with self._lock:
+            self._ensure_loaded()
+            family = self._families.get(font_name)
+            if family is None and self._manifest_changed():
+                self._ensure_loaded(reload_if_changed=True)
+                family = self._families.get(font_name)
+            if family is None:
+                return None
+            paths = {style: self.cache_dir / file for style, file in family.items()}
+            if not all(path.exists() for path in paths.values()):
+                logger.debug(f"Cached font family '{font_name}' is incomplete, removing from index")
+                self._update(lambda: self._families.get(font_name) == family and
+                                     self._families.pop(font_name) is not None)
+                return None
+            return paths
+
+    def source_family(self, source: str) -> Optional[Dict[str, Path]]:
+        """Returns the cached font files of the family downloaded from the given repository font (by style), or None if
+        it was not downloaded (or is no longer complete)."""
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            font_name = self._sources.get(source)
+        return self.family(font_name) if font_name is not None else None
+
+    def sources(self) -> Dict[str, str]:
+        """Returns the repository fonts the cached families were downloaded from, mapped to the font names of the
+        families."""
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            return dict(self._sources)
+
+    def fonts(self) -> Dict[str, Dict[str, Path]]:
+        """Returns all the cached font files that still exist, grouped by font name and then by style."""
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            entries, families = dict(self._entries), dict(self._families)
+        try:  # One scan instead of a stat per file
+            existing = {entry.name for entry in os.scandir(self.cache_dir)}
+            if BLOBS_DIR in existing:
+                existing.update(f"{BLOBS_DIR}/{entry.name}" for entry in os.scandir(self.cache_dir / BLOBS_DIR))
+        except FileNotFoundError:
+            return {}
+        fonts: Dict[str, Dict[str, Path]] = {}
+        for key, entry in entries.items():
+            font_name, _, style = key.rpartition("-")  # Styles do not contain dashes, unlike some font names
+            if font_name and entry["file"] in existing:
+                fonts.setdefault(font_name, {})[style] = self.cache_dir / entry["file"]
+        for font_name, family in families.items():
+            fonts.setdefault(font_name, {}).update(
+                {style: self.cache_dir / file for style, file in family.items() if file in existing})
+        return {font_name: styles for font_name, styles in fonts.items() if styles}
+
+    def remove(self, font_name: str, style: str):
+        """Forgets the cached font for the given font name and style (the file itself is not deleted)."""
+        with self._lock:
+            self._update(lambda: self._entries.pop(self.key(font_name, style), None) is not None)
+
+    def remove_files(self, files: Set[str]):
+        """Forgets all the entries and families that reference any of the given font file names."""
+
+        def mutate():
+            entries = {key: entry for key, entry in self._entries.items() if entry["file"] not in files}
+            families = {name: family for name, family in self._families.items()
+                        if not any(file in files for file in family.values())}
+            sources = {source: name for source, name in self._sources.items() if name in families}
+            changed = len(entries) != len(self._entries) or len(families) != len(self._families)
+            self._entries, self._families, self._sources = entries, families, sources
+            return changed
+
+        if files:
+            with self._lock:
+                self._update(mutate)
+
+    def rebuild(self):
+        """Rebuilds the index from the contents of the cache directory."""
+        with self._lock:
+            self._update(lambda: self._from_data(None))
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        if data is None:
+            self._rebuild()
+            return True
+        self._entries = data["entries"]
+        self._families = data.get("families", {})
+        self._sources = data.get("sources", {})
+        return False
+
+    def _to_data(self) -> dict:
+        return {"entries": self._entries, "families": self._families, "sources": self._sources}
+
+    def _rebuild(self):
+        entries, families = {}, {}
+        if self.cache_dir.is_dir():
+            for suffix in reversed(FONT_SUFFIXES):  # Preferred suffixes overwrite the others
+                for path in sorted((self.cache_dir / BLOBS_DIR).glob("*" + suffix)):
+                    info = read_font_info(path)
+                    if info is None:  # Its keys can not be recovered, so it is pruned as an orphan
+                        continue
+                    file = blob_ref(self.cache_dir, path)
+                    entries[self.key(info.family, info.style)] = {"file": file}
+                    families.setdefault(info.family, {})[info.style] = file
+                for path in self.cache_dir.glob("*" + suffix):
+                    if path.is_file():
+                        entries[path.stem] = {"file": path.name}
+        logger.debug(f"Rebuilt cache index with {len(entries)} entries and {len(families)} families: {self.path}")
+        self._entries = entries
+        self._families = families  # Only families stored as blobs, membership can not be recovered from file names
+        self._sources = {}  # Repositories are not recorded in the fonts, so families may be downloaded again
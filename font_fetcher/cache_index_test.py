@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from font_fetcher.cache_blobs import store_blob
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.testing import make_font
+
+
+def test_cache_index_lookup(tmp_path: Path):
+    """Test that the index finds recorded fonts and forgets fonts that were deleted."""
+    font_path = tmp_path / "Open Sans-Bold.ttf"
+    font_path.write_bytes(b"font")
+
+    index = CacheIndex(tmp_path)
+    assert index.lookup("Open Sans", "Bold") == font_path, "Existing fonts should be found by rebuilding the index"
+    assert index.lookup("Open Sans", "Regular") is None
+
+    font_path.unlink()
+    assert index.lookup("Open Sans", "Bold") is None, "Deleted fonts should not be returned"
+
+    other_path = tmp_path / "Poppins-Regular.otf"
+    other_path.write_bytes(b"font")
+    index.add("Poppins", "Regular", other_path)
+    assert CacheIndex(tmp_path).lookup("Poppins", "Regular") == other_path, "The index should be persisted"
+
+
+def test_cache_index_corrupted(tmp_path: Path):
+    """Test that a corrupted index is rebuilt from the cache directory, including the families stored as blobs."""
+    font_path = tmp_path / "Poppins-Regular.ttf"
+    font_path.write_bytes(b"font")
+    family = {}
+    for style, weight, fs_selection in [("Regular", 400, 0x40), ("Bold", 700, 0x20), ("Bold Italic", 700, 0x21)]:
+        download = tmp_path / f"FakeSans-{style}.otf"
+        download.write_bytes(make_font({1: "Fake Sans", 2: style}, weight, fs_selection))
+        family[style] = store_blob(tmp_path, download)
+    CacheIndex(tmp_path).add_family("fake sans", family)
+    (tmp_path / "index.json").write_text("{not json")
+
+    index = CacheIndex(tmp_path)
+    assert index.lookup("Poppins", "Regular") == font_path
+    assert index.lookup("Fake Sans", "Bold") == family["Bold"]
+    assert index.family("Fake Sans") == family
+
+
+def test_cache_index_fonts(tmp_path: Path):
+    """Test that all cached fonts are grouped by family, skipping deleted files."""
+    paths = {style: tmp_path / f"Fake-Sans-{style}.ttf" for style in ["Regular", "Bold", "Italic"]}
+    for path in paths.values():
+        path.write_bytes(b"font")
+    index = CacheIndex(tmp_path)
+    index.add_family("Fake-Sans", {"Regular": paths["Regular"], "Bold": paths["Bold"]})
+    index.add("Fake-Sans", "Italic", paths["Italic"])
+    index.add("Poppins", "Regular", tmp_path / "Poppins-Regular.ttf")  # Does not exist
+    paths["Bold"].unlink()
+    assert index.fonts() == {"Fake-Sans": {"Regular": paths["Regular"], "Italic": paths["Italic"]}}
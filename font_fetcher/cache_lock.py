@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+if os.name == "nt":
+    import msvcrt
+
+
+    def _lock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)  # Gives up after ~10 seconds
+                return
+            except OSError:
+                continue
+
+
+    def _unlock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+
+    def _lock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+    def _unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+_LOCKS_DIRNAME = ".locks"
+
+# In-process single-flight map: (cache dir, key) -> [lock, number of users]
+_key_locks: Dict[Tuple[Path, str], list] = {}
+_key_locks_lock = threading.Lock()
+
+# In-process single-flight map of coroutines: (event loop, cache dir, key) -> [asyncio lock, number of users]
+_async_key_locks: Dict[tuple, list] = {}
+
+
+class CacheLock:
+    """Exclusive lock on a key of a cache directory, shared by all threads and processes using the same directory.
+
+    Threads of the same process wait on an in-process lock first, so that only one of them holds the (blocking)
+    cross-process file lock at a time. Lock files are kept in the ".locks" subdirectory and never deleted."""
+
+    def __init__(self, cache_dir: Path, key: str):
+        self.cache_dir = cache_dir
+        self.key = key
+        self.path = cache_dir / _LOCKS_DIRNAME / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".lock")
+        self._fd: Optional[int] = None
+        self._thread_lock: Optional[threading.Lock] = None
+
+    def acquire(self):
+        """Blocks until the lock is acquired."""
+        with _key_locks_lock:
+            entry = _key_locks.setdefault((self.cache_dir, self.key), [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        self._thread_lock = entry[0]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            _lock_fd(self._fd)
+        except BaseException:
+            self._release_thread_lock()
+            raise
+
+    def release(self):
+        """Releases the lock (possibly from another thread than the one that acquired it)."""
+        try:
+            _unlock_fd(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._release_thread_lock()
+
+    def _release_thread_lock(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        with _key_locks_lock:
+            entry = _key_locks[(self.cache_dir, self.key)]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _key_locks[(self.cache_dir, self.key)]
+        self._thread_lock.release()
+        self._thread_lock = None
+
+
+@contextmanager
+def cache_lock(cache_dir: Path, key: str):
+    """Holds the CacheLock of a key of a cache directory while in the context."""
+    lock = CacheLock(cache_dir, key)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@asynccontextmanager
+async def cache_lock_async(cache_dir: Path, key: str):
+    """Async variant of cache_lock, which waits for the lock in a worker thread to avoid blocking the event loop.
+
+    Coroutines of the same event loop wait on an asyncio lock first, so that only one of them occupies a worker thread
+    waiting for the CacheLock (and the holder of the lock still finds free worker threads for its own work)."""
+    import asyncio
+    loop_key = (asyncio.get_running_loop(), cache_dir, key)
+    with _key_locks_lock:
+        entry = _async_key_locks.setdefault(loop_key, [asyncio.Lock(), 0])
+        entry[1] += 1
+    try:
+        async with entry[0]:
+            async with _cache_lock_in_thread(cache_dir, key):
+                yield
+    finally:
+        with _key_locks_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _async_key_locks[loop_key]
+
+
+@asynccontextmanager
+async def _cache_lock_in_thread(cache_dir: Path, key: str):
+    import asyncio
+    lock = CacheLock(cache_dir, key)
+    acquiring = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # The lock will still be acquired by the worker thread, so release it as soon as it is
+        acquiring.add_done_callback(lambda f: f.exception() is None and lock.release())
+        raise
+    try:
+        yield
+    finally:
+        lock.release()
+
@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from font_fetcher.cache_blobs import blob_ref
+from font_fetcher.cache_common import JsonManifest, manifest_mtime_ns
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.font_info import read_font_info
+from font_fetcher.misc import logger
+from font_fetcher.names import NameIndex
+from font_fetcher.style import style_traits
+
+_WEIGHT_TOLERANCE = 50
+_Candidate = Tuple[int, bool, str]  # Weight, italic, cached font file (relative to the cache directory)
+
+
+def normalize_font_name(font_name: str) -> str:
+    """Normalizes a font name to compare spellings, ignoring case, spacing and punctuation ("Open Sans" == "OpenSans")."""
+    return "".join(char for char in font_name.lower() if char.isalnum())
+
+
+class FontMetaIndex(JsonManifest):
+    """Persistent metadata (family, style, weight and italic flag) of the cached font files, read from the fonts
+    themselves (see font_fetcher.font_info), to resolve fonts whose name or style is spelled differently than when they
+    were cached (or with the same words in another order, if not exact) without any network access. Other names are
+    never resolved locally, as a close cached family (e.g., "Roboto" for "Roboto Mono") is usually not the wanted one.
+
+    The fonts of each (normalized) name are kept in memory, and only updated when the cache changes."""
+
+    basename = "meta.json"
+    version = 1
+
+    def __init__(self, cache_dir: Path):
+        super().__init__(cache_dir)
+        self._entries: Dict[str, Optional[dict]] = {}  # Cached font file -> metadata (None if not a valid font)
+        self._candidates: Dict[str, List[_Candidate]] = {}  # Normalized font name -> fonts
+        self._names = NameIndex([])  # Cached font names (as fetched and as read from the fonts)
+        self._candidates_key: Optional[Tuple[Optional[int], Optional[int]]] = None
+
+    def resolve(self, font_name: str, style: str, exact: bool = True) -> Optional[Path]:
+        """Returns the cached font file of the wanted family (or, if not exact, of a family with the same words in
+        another order) whose weight and slant match the wanted style, or None if there is no such font."""
+        with self._lock:
+            self._ensure_candidates()
+            fonts = self._candidates.get(normalize_font_name(font_name))
+            if fonts is None and not exact:
+                variants = self._names.variants(font_name)
+                fonts = self._candidates.get(normalize_font_name(self._names.names[variants[0]])) if variants else None
+        if not fonts:
+            return None
+        # Only the same style (other styles may still be fetched, unlike for whole families), allowing for fonts whose
+        # weight class is slightly off (e.g., 350 for "Book")
+        weight, italic = style_traits(style)
+        fonts = [font for font in fonts if font[1] == italic and abs(font[0] - weight) <= _WEIGHT_TOLERANCE]
+        if not fonts:
+            return None
+        _, _, file = min(fonts, key=lambda font: abs(font[0] - weight))
+        path = self.cache_dir / file
+        return path if path.exists() else None
+
+    def _ensure_candidates(self):
+        index = CacheIndex.for_dir(self.cache_dir)
+        candidates_key = (manifest_mtime_ns(index.path), manifest_mtime_ns(self.path))
+        if self._candidates_key is not None and self._candidates_key == candidates_key:
+            return
+        self._ensure_loaded(reload_if_changed=True)
+        fonts = index.fonts()
+        files = {blob_ref(self.cache_dir, path) for styles in fonts.values() for path in styles.values()}
+        if files - self._entries.keys() or self._entries.keys() - files:
+            self._update(lambda: self._sync(files))
+
+        candidates: Dict[str, Dict[str, _Candidate]] = {}
+        for font_name, styles in fonts.items():  # Names and styles the fonts were fetched as
+            # Whole families know the actual style of each file, unlike requested styles resolved to the closest one
+            styles = index.family(font_name) or styles
+            for style, path in styles.items():
+                file = blob_ref(self.cache_dir, path)
+                meta = self._entries.get(file)
+                weight, italic = (meta["weight"], meta["italic"]) if meta is not None else style_traits(style)
+                candidates.setdefault(normalize_font_name(font_name), {})[file] = (weight, italic, file)
+        for file, meta in self._entries.items():  # Names of the fonts themselves
+            if meta is not None and file in files:
+                candidates.setdefault(normalize_font_name(meta["family"]), {})[file] = (
+                    meta["weight"], meta["italic"], file)
+        self._candidates = {name: list(fonts.values()) for name, fonts in candidates.items()}
+        families = {meta["family"] for file, meta in self._entries.items() if meta is not None and file in files}
+        self._names = NameIndex(sorted(families | fonts.keys()))
+        self._candidates_key = (manifest_mtime_ns(index.path), manifest_mtime_ns(self.path))
+
+    def _sync(self, files) -> bool:
+        """Reads the metadata of new cached font files and forgets the removed ones."""
+        entries = {file: meta for file, meta in self._entries.items() if file in files}
+        for file in files - entries.keys():
+            info = read_font_info(self.cache_dir / file)
+            entries[file] = None if info is None else {
+                "family": info.family, "style": info.style, "weight": info.weight, "italic": info.italic}
+        logger.debug(f"Read the metadata of {len(entries.keys() - self._entries.keys())} cached fonts")
+        changed = entries != self._entries
+        self._entries = entries
+        return changed
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        self._entries = data["entries"] if data is not None else {}
+        return False
+
+    def _to_data(self) -> dict:
+        return {"entries": self._entries}
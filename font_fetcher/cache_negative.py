@@ -0,0 +1,81 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from font_fetcher.cache_common import JsonManifest
+
+DEFAULT_NEGATIVE_TTL = float(os.getenv("FONT_FETCHER_NEGATIVE_TTL", 24 * 60 * 60))
+"""Default time (in seconds) to remember that a font could not be found. Zero or negative disables the cache."""
+
+
+class NegativeCache(JsonManifest):
+    """Persistent cache of (font name, style, exact) requests that could not be found in any repository.
+
+    Entries expire after a TTL, after which the font is searched for again."""
+
+    basename = "negative.json"
+    version = 1
+
+    def __init__(self, cache_dir: Path, ttl: float = DEFAULT_NEGATIVE_TTL):
+        super().__init__(cache_dir)
+        self.ttl = ttl
+        self._entries: Dict[str, dict] = {}
+
+    @staticmethod
+    def key(font_name: str, style: str, exact: bool) -> str:
+        """Generates the key of a request."""
+        return f"{font_name}\x1f{style}\x1f{int(exact)}"
+
+    def contains(self, font_name: str, style: str, exact: bool) -> bool:
+        """Returns whether the request is known (and not expired) to not be found."""
+        if self.ttl <= 0:
+            return False
+        key = self.key(font_name, style, exact)
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            entry = self._entries.get(key)
+            return entry is not None and entry["time"] + self.ttl > time.time()
+
+    def add(self, font_name: str, style: str, exact: bool):
+        """Remembers that the request could not be found."""
+        if self.ttl <= 0:
+            return
+
+        def mutate():
+            now = time.time()
+            # Drop expired entries while we are at it, so that the file does not grow forever
+            self._entries = {k: e for k, e in self._entries.items() if e["time"] + self.ttl > now}
+            self._entries[self.key(font_name, style, exact)] = {
+                "name": font_name, "style": style, "exact": exact, "time": now}
+            return True
+
+        with self._lock:
+            self._update(mutate)
+
+    def invalidate(self, font_name: Optional[str] = None, style: Optional[str] = None,
+                   exact: Optional[bool] = None) -> int:
+        """Forgets the matching requests (all of them by default) and returns how many were forgotten."""
+        removed = 0
+
+        def mutate():
+            nonlocal removed
+            kept = {k: e for k, e in self._entries.items() if not (
+                    (font_name is None or e["name"] == font_name) and
+                    (style is None or e["style"] == style) and
+                    (exact is None or e["exact"] == exact))}
+            removed = len(self._entries) - len(kept)
+            self._entries = kept
+            return removed > 0
+
+        with self._lock:
+            if self.cache_dir.is_dir():
+                self._update(mutate)
+            return removed
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        self._entries = data["entries"] if data is not None else {}
+        return False
+
+    def _to_data(self) -> dict:
+        return {"entries": self._entries}
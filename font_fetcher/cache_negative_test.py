@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from font_fetcher.cache_negative import NegativeCache
+
+
+def test_negative_cache(tmp_path: Path):
+    """Test that missing fonts are remembered until they expire or are invalidated."""
+    cache = NegativeCache(tmp_path, ttl=60)
+    assert not cache.contains("Missing", "Regular", True)
+
+    cache.add("Missing", "Regular", True)
+    assert cache.contains("Missing", "Regular", True)
+    assert not cache.contains("Missing", "Regular", False), "Non-exact searches may still succeed"
+    assert NegativeCache(tmp_path, ttl=60).contains("Missing", "Regular", True), "The cache should be persisted"
+    assert not NegativeCache(tmp_path, ttl=0).contains("Missing", "Regular", True), "Zero TTL disables the cache"
+
+    assert cache.invalidate("Other") == 0
+    assert cache.invalidate("Missing") == 1
+    assert not cache.contains("Missing", "Regular", True)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+from font_fetcher.cache_blobs import BLOBS_DIR, blob_ref
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.cache_lock import cache_lock
+from font_fetcher.font_info import FONT_SUFFIXES
+from font_fetcher.misc import logger, parse_age, parse_size
+
+_STALE_DOWNLOAD_AGE = 24 * 60 * 60  # Temporary download directories left behind by killed processes
+
+DEFAULT_MAX_SIZE: Optional[int] = parse_size(os.environ["FONT_FETCHER_CACHE_MAX_SIZE"]) \
+    if os.getenv("FONT_FETCHER_CACHE_MAX_SIZE") else None
+"""Default maximum size (in bytes) of the cached fonts, or None for no limit."""
+
+DEFAULT_MAX_AGE: Optional[float] = parse_age(os.environ["FONT_FETCHER_CACHE_MAX_AGE"]) \
+    if os.getenv("FONT_FETCHER_CACHE_MAX_AGE") else None
+"""Default maximum time (in seconds) since a cached font was last used, or None for no limit."""
+
+
+@dataclass
+class CacheStats:
+    """The cache directory."""
+    cache_dir: Path
+
+    """The number of cached font files."""
+    files: int = 0
+
+    """The total size (in bytes) of the cached font files."""
+    size: int = 0
+
+    """The last time (as a timestamp) the least recently used font was used (None if empty)."""
+    oldest_access: Optional[float] = None
+
+    """The last time (as a timestamp) the most recently used font was used (None if empty)."""
+    newest_access: Optional[float] = None
+
+
+def _font_files(cache_dir: Path) -> List[Tuple[Path, os.stat_result]]:
+    """Lists the stored font files: content-addressed blobs, and files named after their key (older caches)."""
+    files = []
+    for directory in [cache_dir, cache_dir / BLOBS_DIR]:
+        if directory.is_dir():
+            for entry in os.scandir(directory):
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in FONT_SUFFIXES:
+                    files.append((Path(entry.path), entry.stat()))
+    return files
+
+
+def _is_orphan(cache_dir: Path, path: Path, referenced: Set[str], stat: os.stat_result, now: float) -> bool:
+    """Whether a blob is no longer referenced by the index (e.g., after it was rebuilt). Recent blobs may be about to be
+    indexed by a concurrent fetch, so they are kept."""
+    return path.parent.name == BLOBS_DIR and blob_ref(cache_dir, path) not in referenced and \
+        now - stat.st_mtime > _STALE_DOWNLOAD_AGE
+
+
+def cache_stats(cache_dir: Path) -> CacheStats:
+    """Returns statistics about the fonts in the cache directory."""
+    files = _font_files(cache_dir)
+    last_accesses = [stat.st_mtime for _, stat in files]
+    return CacheStats(cache_dir=cache_dir, files=len(files), size=sum(stat.st_size for _, stat in files),
+                      oldest_access=min(last_accesses, default=None), newest_access=max(last_accesses, default=None))
+
+
+def prune_cache(cache_dir: Path, max_size: Optional[int] = None, max_age: Optional[float] = None,
+                keep: Iterable[Path] = (), dry_run: bool = False) -> List[Path]:
+    """Removes the least recently used fonts from the cache directory until the given limits are met, and returns the
+    removed files. Fonts in keep (e.g., the ones that were just fetched) are never removed.
+
+    The last use of each font is tracked by its modification time, which is refreshed by cache hits. Blobs that are no
+    longer referenced by the index are removed too."""
+    keep = {blob_ref(cache_dir, path) for path in keep}
+    removed = []
+    if not cache_dir.is_dir():
+        return removed
+    with cache_lock(cache_dir, "prune"):
+        index = CacheIndex.for_dir(cache_dir)
+        referenced = {blob_ref(cache_dir, path) for styles in index.fonts().values() for path in styles.values()}
+        now = time.time()
+        files = []
+        for path, stat in _font_files(cache_dir):
+            if _is_orphan(cache_dir, path, referenced, stat, now):
+                logger.debug(f"Pruning orphan cached font: {path}")
+                removed.append(path)
+            else:
+                files.append((path, stat))
+        files.sort(key=lambda file: file[1].st_mtime)  # Least recently used first
+        size = sum(stat.st_size for _, stat in files)
+        for path, stat in files:
+            too_old = max_age is not None and now - stat.st_mtime > max_age
+            too_big = max_size is not None and size > max_size
+            if not (too_old or too_big):
+                break  # Sorted by last use, so the remaining fonts are newer and the size is within the limit
+            if blob_ref(cache_dir, path) in keep:
+                continue
+            logger.debug(f"Pruning cached font ({'too old' if too_old else 'cache too big'}): {path}")
+            removed.append(path)
+            size -= stat.st_size
+
+        if not dry_run:
+            index.remove_files({blob_ref(cache_dir, path) for path in removed})
+            for path in removed:
+                path.unlink(missing_ok=True)
+            for tmp_dir in cache_dir.glob(".download-*"):
+                if now - tmp_dir.stat().st_mtime > _STALE_DOWNLOAD_AGE:
+                    logger.debug(f"Removing stale download directory: {tmp_dir}")
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return removed
@@ -0,0 +1,54 @@
+import os
+import time
+from pathlib import Path
+
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.cache_prune import cache_stats, prune_cache
+from font_fetcher.misc import parse_age, parse_size
+
+
+def _cached_font(cache_dir: Path, name: str, size: int, last_use_ago: float) -> Path:
+    path = cache_dir / f"{name}-Regular.ttf"
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    last_use = time.time() - last_use_ago
+    os.utime(path, (last_use, last_use))
+    return path
+
+
+def test_prune_cache(tmp_path: Path):
+    """Test that the least recently used fonts are pruned first, and that cache hits count as uses."""
+    oldest = _cached_font(tmp_path, "Oldest", 100, 3 * 24 * 60 * 60)
+    old = _cached_font(tmp_path, "Old", 100, 2 * 24 * 60 * 60)
+    new = _cached_font(tmp_path, "New", 100, 60)
+    index = CacheIndex.for_dir(tmp_path)
+    assert index.lookup("Oldest", "Regular") == oldest  # Marks it as recently used
+    assert cache_stats(tmp_path).size == 300
+
+    assert prune_cache(tmp_path, max_size=250, dry_run=True) == [old]
+    assert old.exists()
+    assert prune_cache(tmp_path, max_size=150, keep=[new]) == [old, oldest]
+    assert not old.exists() and index.lookup("Old", "Regular") is None
+    assert prune_cache(tmp_path, max_age=parse_age("5m")) == []
+    assert cache_stats(tmp_path).files == 1
+    assert prune_cache(tmp_path, max_age=parse_age("30s")) == [new]
+    assert cache_stats(tmp_path).files == 0
+
+
+def test_prune_orphan_blobs(tmp_path: Path):
+    """Test that old blobs that are no longer referenced by the index are pruned."""
+    referenced = _cached_font(tmp_path / "blobs", "referenced", 100, 3 * 24 * 60 * 60)
+    orphan = _cached_font(tmp_path / "blobs", "orphan", 100, 3 * 24 * 60 * 60)
+    recent_orphan = _cached_font(tmp_path / "blobs", "recent", 100, 60)
+    CacheIndex.for_dir(tmp_path).add("Referenced", "Regular", referenced)
+    assert prune_cache(tmp_path) == [orphan]
+    assert referenced.exists() and recent_orphan.exists()
+
+
+def test_parse_limits():
+    """Test parsing human-readable cache limits."""
+    assert parse_size("1024") == 1024
+    assert parse_size("500M") == 500 * 1024 ** 2
+    assert parse_size("2GiB") == 2 * 1024 ** 3
+    assert parse_age("90m") == 90 * 60
+    assert parse_age("30d") == 30 * 24 * 60 * 60
@@ -0,0 +1,90 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from font_fetcher.cache_common import JsonManifest
+from font_fetcher.repo import Font, FontRepo
+
+DEFAULT_SEARCH_TTL = float(os.getenv("FONT_FETCHER_SEARCH_TTL", 24 * 60 * 60))
+"""Default time (in seconds) to reuse the results of a search. Zero or negative disables the cache."""
+
+DEFAULT_SEARCH_MAX_ENTRIES = int(os.getenv("FONT_FETCHER_SEARCH_MAX_ENTRIES", 1000))
+"""Default maximum number of cached searches (the least recently used ones are evicted first)."""
+
+
+def _font_to_dict(font: Font) -> dict:
+    return dict(vars(font))  # Also keeps private attributes set by repositories, such as download URLs
+
+
+def _font_from_dict(data: dict) -> Font:
+    font = Font(name=data["name"])
+    for attr, value in data.items():
+        setattr(font, attr, value)
+    return font
+
+
+class SearchCache(JsonManifest):
+    """Persistent cache of the search results of each repository, per normalized query.
+
+    Entries expire after a TTL, and only the most recently used ones are kept."""
+
+    basename = "search.json"
+    version = 1
+
+    def __init__(self, cache_dir: Path, ttl: float = DEFAULT_SEARCH_TTL,
+                 max_entries: int = DEFAULT_SEARCH_MAX_ENTRIES):
+        super().__init__(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, dict] = {}  # In least to most recently used order
+
+    @staticmethod
+    def key(repo: FontRepo, query: str) -> str:
+        """Generates the key of a search (see FontRepo.identity), normalizing the query."""
+        return f"{repo.identity}\x1f{' '.join(query.lower().split())}"
+
+    def get(self, repo: FontRepo, query: str, expired: bool = False) -> Optional[List[Font]]:
+        """Returns the cached search results, or None if the search was not cached (or expired, unless expired results
+        are wanted, e.g., because they were revalidated)."""
+        if self.ttl <= 0:
+            return None
+        key = self.key(repo, query)
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            entry = self._entries.get(key)
+            if entry is None or (not expired and entry["time"] + self.ttl <= time.time()):
+                return None
+            self._entries[key] = self._entries.pop(key)  # Mark as recently used (persisted on the next update)
+            return [_font_from_dict(font) for font in entry["fonts"]]
+
+    def add(self, repo: FontRepo, query: str, fonts: List[Font]):
+        """Caches the results of a search."""
+        if self.ttl <= 0:
+            return
+
+        def mutate():
+            now = time.time()
+            self._entries = {k: e for k, e in self._entries.items() if e["time"] + self.ttl > now}
+            self._entries.pop(key, None)
+            self._entries[key] = {"time": now, "fonts": [_font_to_dict(font) for font in fonts]}
+            for evicted in list(self._entries.keys())[:max(0, len(self._entries) - self.max_entries)]:
+                del self._entries[evicted]
+            return True
+
+        key = self.key(repo, query)
+        with self._lock:
+            self._update(mutate)
+
+    def clear(self):
+        """Forgets all cached searches."""
+        with self._lock:
+            if self.cache_dir.is_dir():
+                self._update(lambda: bool(self._entries) and not self._entries.clear())
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        self._entries = data["entries"] if data is not None else {}
+        return False
+
+    def _to_data(self) -> dict:
+        return {"entries": self._entries}
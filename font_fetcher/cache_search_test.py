@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from font_fetcher.cache_search import SearchCache
+from font_fetcher.repo import Font
+from font_fetcher.repo_1001fonts import Fonts1001Repo
+from font_fetcher.testing import FakeFamilyRepo
+
+
+def test_search_cache(tmp_path: Path):
+    """Test that search results (including private attributes) are cached per normalized query, up to a limit."""
+    repo = FakeFamilyRepo()
+    font = Font(name="Fake Sans")
+    font._url = "https://example.com/fake-sans.zip"
+
+    cache = SearchCache(tmp_path, ttl=60, max_entries=2)
+    assert cache.get(repo, "Fake Sans") is None
+    cache.add(repo, "Fake Sans", [font])
+    cached = SearchCache(tmp_path, ttl=60).get(repo, " fake  SANS ")
+    assert [(f.name, f._url) for f in cached] == [("Fake Sans", font._url)], "The cache should be persisted"
+
+    cache.add(repo, "Other", [])
+    cache.add(repo, "Another", [])
+    assert cache.get(repo, "Fake Sans") is None, "The least recently used search should be evicted"
+    assert cache.get(repo, "Other") == []
+    assert SearchCache(tmp_path, ttl=0).get(repo, "Other") is None, "Zero TTL disables the cache"
+
+
+def test_search_cache_per_repo(tmp_path: Path):
+    """Test that the searches of differently configured repositories of the same class are cached separately."""
+    repo, mirror = Fonts1001Repo(), Fonts1001Repo()
+    mirror.search_url = "http://localhost:8080/search.html"
+    cache = SearchCache(tmp_path, ttl=60)
+    cache.add(repo, "Fake Sans", [Font(name="Fake Sans")])
+    assert cache.get(mirror, "Fake Sans") is None
+    assert [font.name for font in cache.get(repo, "Fake Sans")] == ["Fake Sans"]
@@ -0,0 +1,54 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from font_fetcher.cache_common import JsonManifest
+
+DEFAULT_VALIDATORS_MAX_ENTRIES = int(os.getenv("FONT_FETCHER_VALIDATORS_MAX_ENTRIES", 10000))
+"""Default maximum number of remembered URLs (the least recently updated ones are evicted first)."""
+
+
+class ValidatorCache(JsonManifest):
+    """Persistent cache of the validators (ETag and Last-Modified headers) of downloaded URLs, so that they can be
+    revalidated with conditional requests instead of being downloaded again."""
+
+    basename = "validators.json"
+    version = 1
+
+    def __init__(self, cache_dir: Path, max_entries: int = DEFAULT_VALIDATORS_MAX_ENTRIES):
+        super().__init__(cache_dir)
+        self.max_entries = max_entries
+        self._entries: Dict[str, dict] = {}  # In least to most recently updated order
+
+    def get(self, url: str) -> Optional[dict]:
+        """Returns the validators of a URL ("etag" and/or "last_modified"), or None if unknown."""
+        with self._lock:
+            self._ensure_loaded(reload_if_changed=True)
+            entry = self._entries.get(url)
+            return entry["validators"] if entry is not None else None
+
+    def add(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        """Remembers the validators of a URL (forgetting them if there are none)."""
+        entry = {key: value for key, value in {"etag": etag, "last_modified": last_modified}.items() if value}
+
+        def mutate():
+            if self._entries.get(url, {}).get("validators") == entry:
+                return False
+            self._entries.pop(url, None)
+            if entry:
+                self._entries[url] = {"validators": entry, "time": time.time()}
+            for evicted in list(self._entries.keys())[:max(0, len(self._entries) - self.max_entries)]:
+                del self._entries[evicted]
+            return True
+
+        with self._lock:
+            if entry or url in self._entries:
+                self._update(mutate)
+
+    def _from_data(self, data: Optional[dict]) -> bool:
+        self._entries = data["entries"] if data is not None else {}
+        return False
+
+    def _to_data(self) -> dict:
+        return {"entries": self._entries}
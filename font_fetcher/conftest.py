@@ -0,0 +1,27 @@
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+import font_fetcher
+from font_fetcher.testing import FakeFamilyRepo, FakeFontRepoServer
+
+
+@pytest.fixture
+def fake_repo(tmp_path: Path, monkeypatch) -> FakeFamilyRepo:
+    """Replaces the cache directory with an empty one and the registered repositories with a FakeFamilyRepo."""
+    repo = FakeFamilyRepo()
+    monkeypatch.setattr(font_fetcher, "_CACHE_DIR", tmp_path)
+    registry = font_fetcher._repo_registry()
+    original_repos = list(registry)
+    registry[:] = [repo]
+    yield repo
+    registry[:] = original_repos
+
+
+@pytest.fixture
+def fake_repo_server() -> Callable[..., FakeFontRepoServer]:
+    """Starts FakeFontRepoServer instances (with the given arguments), which are stopped after the test."""
+    with ExitStack() as stack:
+        yield lambda *args, **kwargs: stack.enter_context(FakeFontRepoServer(*args, **kwargs))
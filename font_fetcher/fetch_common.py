@@ -0,0 +1,267 @@
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import font_fetcher
+from font_fetcher.cache_blobs import store_blob
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.cache_negative import NegativeCache
+from font_fetcher.cache_prune import prune_cache
+from font_fetcher.cache_search import SearchCache
+from font_fetcher.cache_validators import ValidatorCache
+from font_fetcher.font_info import font_style
+from font_fetcher.metrics import fetch_metrics
+from font_fetcher.misc import logger
+from font_fetcher.repo import Font, FontRepo, NotModifiedError
+from font_fetcher.repo_stats import repo_stats_table
+
+
+@dataclass
+class Fetcher:
+    """The steps of fetching fonts from the registered repositories into a cache directory, shared by the blocking API
+    (font_fetcher) and the async one (font_fetcher.aio), which only differ in how they wait for the repositories.
+
+    Steps that only touch the cache directory are blocking (the async API runs them in worker threads)."""
+
+    """The cache directory."""
+    cache_dir: Path
+
+    """The maximum size (in bytes) of the cached fonts, or None for no limit (see font_fetcher.set_cache_limits)."""
+    max_size: Optional[int] = None
+
+    """The maximum time (in seconds) since each cached font was last used, or None for no limit."""
+    max_age: Optional[float] = None
+
+    """How long (in seconds) to wait for the search of each repository (see font_fetcher.set_repo_timeout)."""
+    repo_timeout: float = 0
+
+    @classmethod
+    def current(cls) -> "Fetcher":
+        """Returns the fetcher configured through the font_fetcher module."""
+        # noinspection PyProtectedMember
+        return cls(font_fetcher._CACHE_DIR, font_fetcher._cache_max_size, font_fetcher._cache_max_age,
+                   font_fetcher._repo_timeout)
+
+    @property
+    def repos(self) -> List[FontRepo]:
+        """The registered repositories (see font_fetcher.repo_registry)."""
+        # noinspection PyProtectedMember
+        return font_fetcher._repo_registry()
+
+    @staticmethod
+    def lock_key(font_name: str) -> str:
+        """The key of the lock held while fetching a family, so that it is only fetched by one thread or process at a
+        time (see font_fetcher.cache_lock)."""
+        return f"fetch-{font_name}"
+
+    @staticmethod
+    def font_source(repo: FontRepo, font: Font) -> str:
+        """Identifies a font of a repository (see FontRepo.identity), to recognize families that were already downloaded
+        under another name."""
+        return f"{repo.identity}\x1f{font.name}"
+
+    def cache_index(self) -> CacheIndex:
+        """Returns the (lazily loaded) index of the cache directory."""
+        return CacheIndex.for_dir(self.cache_dir)
+
+    def recording_validators(self, revalidate: bool = False):
+        """Records the validators of the responses of repositories in the cache directory while in the context (see
+        font_fetcher.repo_common.recording_validators)."""
+        from font_fetcher.repo_common import recording_validators
+        return recording_validators(ValidatorCache.for_dir(self.cache_dir), revalidate)
+
+    def raise_if_known_missing(self, font_name: str, style: str, exact: bool):
+        """Raises FileNotFoundError if the font was recently not found in any repository."""
+        if NegativeCache.for_dir(self.cache_dir).contains(font_name, style, exact):
+            raise FileNotFoundError(f"Font '{font_name}' with style '{style}' was recently not found in any registered "
+                                    f"repositories (see invalidate_negative_cache).")
+
+    def not_found(self, font_name: str, style: str, exact: bool) -> FileNotFoundError:
+        """Remembers that the font was not found in any repository and returns the error to raise."""
+        NegativeCache.for_dir(self.cache_dir).add(font_name, style, exact)
+        fetch_metrics.increment("not_found")
+        return FileNotFoundError(f"Font '{font_name}' with style '{style}' not found in any registered repositories.")
+
+    def fetched_meanwhile(self, font_name: str, style: str, exact: bool) -> Optional[Path]:
+        """Checks the results of other threads or processes that held the fetch lock while we were waiting for it."""
+        cached_path = font_fetcher.fetch_font_cached(font_name, style)
+        if cached_path is not None:
+            logger.debug(f"Font '{font_name}' with style '{style}' was fetched while waiting: {cached_path}")
+            return cached_path
+        self.raise_if_known_missing(font_name, style, exact)
+        return None
+
+    def cached_search(self, repo: FontRepo, font_name: str) -> Optional[List[Font]]:
+        """Returns the recent results of the same search of a repository, or None if it must be searched."""
+        fonts = SearchCache.for_dir(self.cache_dir).get(repo, font_name) if repo.cache_searches else None
+        if fonts is not None:
+            fetch_metrics.increment("search_cache_hits")
+            logger.debug(f"Reusing cached search results for '{font_name}' in {repo.__class__.__name__}")
+        return fonts
+
+    def searched(self, repo: FontRepo, font_name: str, fonts: List[Font], seconds: float):
+        """Records the results of a completed search of a repository."""
+        repo_stats_table.record_search(repo, seconds, is_exact_match(fonts, font_name))
+        # Misses are remembered by the negative cache instead, so that invalidating it searches again
+        if fonts and repo.cache_searches:
+            SearchCache.for_dir(self.cache_dir).add(repo, font_name, fonts)
+
+    def search_font(self, repo: FontRepo, font_name: str, refresh: bool = False) -> List[Font]:
+        """Searches a repository for a font, reusing recent results of the same search (if refreshing, only if the
+        repository reports that they did not change)."""
+        fonts = None if refresh else self.cached_search(repo, font_name)
+        if fonts is None:
+            start = time.perf_counter()
+            try:
+                if refresh:
+                    fonts = self._search_font_revalidating(repo, font_name)
+                else:
+                    with self.recording_validators():
+                        fonts = repo.search_font(font_name)
+            except Exception:
+                repo_stats_table.record_failure(repo)
+                raise
+            self.searched(repo, font_name, fonts, time.perf_counter() - start)
+        return fonts
+
+    def _search_font_revalidating(self, repo: FontRepo, font_name: str) -> List[Font]:
+        try:
+            with self.recording_validators(revalidate=True):
+                return repo.search_font(font_name)
+        except NotModifiedError:
+            cache = SearchCache.for_dir(self.cache_dir)
+            fonts = cache.get(repo, font_name, expired=True) if repo.cache_searches else None
+            if fonts is not None:
+                logger.debug(f"Search results for '{font_name}' in {repo.__class__.__name__} did not change")
+                return fonts
+            with self.recording_validators():  # The results were evicted, search again unconditionally
+                return repo.search_font(font_name)
+
+    def download_dir(self) -> tempfile.TemporaryDirectory:
+        """Creates a temporary directory for downloads inside the cache directory, so that files can be moved
+        atomically."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return tempfile.TemporaryDirectory(dir=self.cache_dir, prefix=".download-")
+
+    def cache_known_family(self, font_name: str, style: str, source: str) -> Optional[Path]:
+        """Indexes the family downloaded from the given source under another name (if any) by the wanted font name too,
+        returning the cached font of the wanted style, so that fetching it again does not download anything."""
+        family = self.cache_index().source_family(source)
+        if family is None:
+            return None
+        logger.debug(f"Font '{font_name}' was already cached under another name, only indexing it")
+        self.cache_index().add_family(font_name, family)
+        return font_fetcher.fetch_font_cached(font_name, style)
+
+    def cache_family(self, font_name: str, font_files: List[Path], source: Optional[str] = None):
+        """Atomically moves all the downloaded font files of a family into the cache (see store_blob), indexed by the
+        style of each file."""
+        family = {}
+        for font_file in font_files:
+            file_style = font_style(font_file)
+            if file_style in family:
+                logger.debug(f"Skipping '{font_file.name}' as style '{file_style}' was already cached for "
+                             f"'{font_name}'")
+                continue
+            family[file_style] = store_blob(self.cache_dir, font_file)
+        logger.debug(f"Cached styles {list(family.keys())} of font '{font_name}'")
+        self.cache_index().add_family(font_name, family, source)
+        self.enforce_cache_limits(keep=family.values())
+
+    def cache_downloaded_family(self, font_name: str, style: str, font_files: List[Path], source: str) -> Path:
+        """Caches a downloaded family (see cache_family), returning the cached font of the wanted style."""
+        self.cache_family(font_name, font_files, source)
+        return font_fetcher.fetch_font_cached(font_name, style)
+
+    def cache_single(self, font_name: str, style: str, downloaded: Path) -> Path:
+        """Atomically moves a single downloaded font file into the cache, indexed by the requested font name and
+        style."""
+        # Index with user-provided name and style in case they are not exact matches
+        cached_path = store_blob(self.cache_dir, downloaded)
+        self.cache_index().add(font_name, style, cached_path)
+        self.enforce_cache_limits(keep=[cached_path])
+        return cached_path
+
+    def enforce_cache_limits(self, keep: Iterable[Path]):
+        """Evicts the least recently used fonts (except the given ones) if the cache exceeds the configured limits."""
+        if self.max_size is not None or self.max_age is not None:
+            removed = prune_cache(self.cache_dir, self.max_size, self.max_age, keep=keep)
+            if removed:
+                logger.info(f"Evicted {len(removed)} least recently used fonts from the cache")
+
+
+def is_exact_match(fonts: List[Font], font_name: str) -> bool:
+    """Whether the first search result is the wanted font (ignoring case)."""
+    return len(fonts) > 0 and fonts[0].name.lower() == font_name.lower()
+
+
+class RepoSearch:
+    """The search of the registered repositories for a font, fed with the outcome of the search of each repository by
+    the caller, which runs the searches of each round (see rounds) concurrently until the search is over.
+
+    Repositories are searched in rounds: the local ones (see FontRepo.local), the preferred remote ones if no local one
+    matched exactly, then the demoted ones (see RepoStats) if none of them matched. The search is over as soon as a
+    repository matches exactly; otherwise the searches of the round are waited for (up to the configured timeout) and
+    the inexact results of the first registered repository win."""
+
+    def __init__(self, fetcher: Fetcher, font_name: str, exact: bool):
+        self.fetcher = fetcher
+        self.font_name = font_name
+        self.exact = exact
+        self.found: Optional[Tuple[FontRepo, List[Font]]] = None
+        self.inexact: List[Tuple[FontRepo, List[Font]]] = []
+        self.error: Optional[Exception] = None
+
+    def rounds(self) -> Iterator[List[FontRepo]]:
+        """The repositories to search concurrently in each round, from the most to the least promising, until a round
+        matched."""
+        local, preferred, demoted = repo_stats_table.order(self.fetcher.repos)
+        if local:
+            yield local
+        if preferred and self.found is None:
+            yield preferred
+        if demoted and self.found is None and not self.inexact:
+            yield demoted
+
+    def deadline(self) -> Optional[float]:
+        """The time (see time.monotonic) to give up on the searches of a round started now, or None to wait for them."""
+        return time.monotonic() + self.fetcher.repo_timeout if self.fetcher.repo_timeout > 0 else None
+
+    def add(self, repo: FontRepo, fonts: Optional[List[Font]] = None, error: Optional[BaseException] = None) -> bool:
+        """Records the outcome of the search of a repository (its results or its error), returning whether the search
+        is over (the repository matched exactly)."""
+        if error is not None:
+            logger.debug(f"Search for '{self.font_name}' failed in repository {repo.__class__.__name__}: {error}")
+            self.error = self.error or error
+        elif is_exact_match(fonts, self.font_name):
+            self.found = repo, fonts
+        elif len(fonts) == 0 or self.exact:
+            logger.debug(f"Font '{self.font_name}' not found (exactly) in repository: {repo.__class__.__name__}")
+        else:
+            self.inexact.append((repo, fonts))
+        return self.found is not None
+
+    def timed_out(self, repos: List[FontRepo]):
+        """Records the repositories whose search did not complete before the deadline."""
+        for repo in repos:
+            logger.debug(f"Search for '{self.font_name}' timed out in repository: {repo.__class__.__name__}")
+            repo_stats_table.record_failure(repo)
+        self.error = self.error or TimeoutError(f"Search for font '{self.font_name}' timed out in: "
+                                                f"{', '.join(repo.__class__.__name__ for repo in repos)}")
+
+    def result(self) -> Optional[Tuple[FontRepo, List[Font]]]:
+        """Returns the matching repository and its results (the exact match, otherwise the inexact results of the first
+        registered repository), or None if none of them matched.
+
+        Raises the first search error (or a TimeoutError) if no repository matched but some did not answer, so that the
+        font is not remembered as missing."""
+        if self.found is not None:
+            return self.found
+        if self.inexact:
+            order = {id(repo): i for i, repo in enumerate(self.fetcher.repos)}
+            return min(self.inexact, key=lambda found: order.get(id(found[0]), len(order)))
+        if self.error is not None:
+            raise self.error
+        return None
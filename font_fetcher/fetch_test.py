@@ -0,0 +1,146 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import font_fetcher
+from font_fetcher.repo_1001fonts import Fonts1001Repo
+from font_fetcher.testing import FakeFamilyRepo
+
+
+def test_fetch_font_family(fake_repo: FakeFamilyRepo):
+    """Test that all styles of a family are cached with a single download."""
+    assert font_fetcher.fetch_font("Fake Sans", "Bold").read_bytes() == b"Bold"
+    assert font_fetcher.fetch_font("Fake Sans", "Bold Italic").read_bytes() == b"BoldItalic"
+    assert font_fetcher.fetch_font("Fake Sans", "italic").read_bytes() == b"Italic"
+    assert font_fetcher.fetch_font("Fake Sans", "Regular").read_bytes() == b"Regular"
+    assert fake_repo.downloads == 1, "Other styles of the family should be served from the cache"
+
+
+def test_fetch_font_search_cached(fake_repo: FakeFamilyRepo):
+    """Test that repeated searches are served from the cache."""
+    for expected_searches in [1, 1]:
+        font_fetcher.fetch_font("Fake Sans", "Bold").unlink()  # Force downloading again
+        assert fake_repo.searches == expected_searches
+    font_fetcher.invalidate_search_cache()
+    font_fetcher.fetch_font("Fake Sans", "Bold")
+    assert (fake_repo.searches, fake_repo.downloads) == (2, 3)
+
+
+def test_fetch_font_not_found(fake_repo: FakeFamilyRepo, monkeypatch):
+    """Test that fonts that could not be found are not searched for again until invalidated."""
+    searches = []
+    monkeypatch.setattr(fake_repo, "search_font", lambda font_name: searches.append(font_name) or [])
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            font_fetcher.fetch_font("Missing", "Regular")
+    assert searches == ["Missing"]
+
+    assert font_fetcher.invalidate_negative_cache("Missing") == 1
+    with pytest.raises(FileNotFoundError):
+        font_fetcher.fetch_font("Missing", "Regular")
+    assert searches == ["Missing", "Missing"]
+
+
+def test_fetch_fonts(fake_repo: FakeFamilyRepo):
+    """Test that batches download each family once and report errors per request."""
+    results = font_fetcher.fetch_fonts([("Fake Sans", "Regular"), ("Missing", "Bold"), ("Fake Sans", "Bold"),
+                                        ("Missing", "Regular"), ("Fake Sans", "Italic")])
+    assert [(r.font_name, r.style) for r in results] == [("Fake Sans", "Regular"), ("Missing", "Bold"),
+                                                         ("Fake Sans", "Bold"), ("Missing", "Regular"),
+                                                         ("Fake Sans", "Italic")]
+    assert [r.path.read_bytes() for r in results if r.font_name == "Fake Sans"] == [b"Regular", b"Bold", b"Italic"]
+    assert all(isinstance(r.error, FileNotFoundError) and r.path is None for r in results if r.font_name == "Missing")
+    assert fake_repo.downloads == 1
+
+    # Once a family failed, the other styles are resolved from the cache the same way as by fetch_font
+    results = font_fetcher.fetch_fonts([("Sans Fake", "Black"), ("Sans Fake", "Bold")], exact=False)
+    assert isinstance(results[0].error, FileNotFoundError)
+    assert results[1].path == font_fetcher.fetch_font("Sans Fake", "Bold", exact=False)
+
+
+def test_fetch_font_concurrent(fake_repo: FakeFamilyRepo):
+    """Test that concurrent fetches of the same family wait for a single download."""
+    styles = ["Regular", "Bold", "Italic", "Bold Italic"] * 4
+    with ThreadPoolExecutor(max_workers=len(styles)) as executor:
+        paths = list(executor.map(lambda style: font_fetcher.fetch_font("Fake Sans", style), styles))
+    assert all(path.exists() for path in paths)
+    assert fake_repo.downloads == 1
+
+
+def test_fetch_font_fan_out(fake_repo: FakeFamilyRepo, monkeypatch):
+    """Test that repositories are searched concurrently and the first match wins without waiting for the others."""
+    slow_repo = FakeFamilyRepo(family=None, delay=0.5)
+    font_fetcher._repo_registry()[:] = [slow_repo, fake_repo]
+    start = time.monotonic()
+    assert font_fetcher.fetch_font("Fake Sans", "Bold").read_bytes() == b"Bold"
+    assert time.monotonic() - start < 0.4, "The slow repository should not be waited for"
+    assert font_fetcher.repo_stats(fake_repo).hits == 1
+
+    monkeypatch.setattr(font_fetcher, "_repo_timeout", 0.1)
+    with pytest.raises(TimeoutError):
+        font_fetcher.fetch_font("Missing", "Regular")
+    assert font_fetcher.repo_stats(slow_repo).failures == 1
+    assert not font_fetcher.invalidate_negative_cache(), "Timed out searches should not be remembered as missing"
+
+
+def test_fetch_font_fan_out_inexact(fake_repo: FakeFamilyRepo, tmp_path, monkeypatch):
+    """Test that inexact results do not end the search before a slower exact match, and that otherwise the inexact
+    results of the first registered repository win."""
+    exact_repo, condensed_repo = FakeFamilyRepo(delay=0.2), FakeFamilyRepo("Fake Sans Condensed")
+    font_fetcher._repo_registry()[:] = [condensed_repo, exact_repo]
+    assert font_fetcher.fetch_font("Fake Sans", "Bold", exact=False).read_bytes() == b"Bold"
+    assert (exact_repo.downloads, condensed_repo.downloads) == (1, 0)
+
+    monkeypatch.setattr(font_fetcher, "_CACHE_DIR", tmp_path / "other")
+    slow_repo, fast_repo = FakeFamilyRepo("Fake Sans Condensed", delay=0.2), FakeFamilyRepo("Fake Sans Condensed")
+    font_fetcher._repo_registry()[:] = [slow_repo, fast_repo]
+    font_fetcher.fetch_font("Fake Sans", "Bold", exact=False)
+    assert (slow_repo.downloads, fast_repo.downloads) == (1, 0)
+
+
+def test_fetch_font_dedup(fake_repo: FakeFamilyRepo, tmp_path):
+    """Test that fonts fetched under several names are stored once, and only downloaded once."""
+    path = font_fetcher.fetch_font("Fake Sans", "Bold")
+    assert font_fetcher.fetch_font("fake sans", "Bold") == path, "Aliases should reference the same blob"
+    assert fake_repo.downloads == 1, "Families known under another name should only be indexed"
+    assert len(list((tmp_path / "blobs").iterdir())) == 4
+
+    font_fetcher._cache_index().remove_files({"blobs/" + path.name})
+    font_fetcher.fetch_font("FAKE SANS", "Bold")
+    assert fake_repo.downloads == 2 and len(list((tmp_path / "blobs").iterdir())) == 4, \
+        "Downloading again should reuse the stored blobs"
+
+
+def test_fetch_font_other_spellings(fake_repo: FakeFamilyRepo):
+    """Test that other spellings of cached fonts (or reordered words, if not exact) are resolved locally, and that
+    other names are searched for instead."""
+    bold_italic = font_fetcher.fetch_font("Fake Sans", "Bold Italic")
+    assert font_fetcher.fetch_font_cached("FakeSans", "BoldItalic") == bold_italic
+    assert font_fetcher.fetch_font_cached("fake-sans", "bold italic") == bold_italic
+    assert font_fetcher.fetch_font_cached("Sans Fake", "Bold Italic", exact=False) == bold_italic
+    assert font_fetcher.fetch_font_cached("Sans Fake", "Bold Italic") is None, "Inexact matches should not be indexed"
+    assert font_fetcher.fetch_font_cached("FakeSans", "Black") is None, "Missing styles should still be fetched"
+    assert fake_repo.searches == 1
+    for close_name in ["Fake Sanz", "Fake Sans Mono"]:
+        assert font_fetcher.fetch_font_cached(close_name, "Bold Italic", exact=False) is None
+        with pytest.raises(FileNotFoundError):
+            font_fetcher.fetch_font(close_name, "Bold Italic", exact=False)
+    assert fake_repo.searches == 3, "Close names should be searched for"
+
+
+def test_refresh_cache(fake_repo: FakeFamilyRepo, fake_repo_server):
+    """Test that refreshing revalidates the cached families conditionally, only downloading the ones that changed."""
+    server = fake_repo_server({"Fake Sans": ["Regular", "Bold"]}, validators=True)
+    font_fetcher._repo_registry()[:] = [server.configure_repo(Fonts1001Repo())]
+    bold = font_fetcher.fetch_font("Fake Sans", "Bold")
+    assert font_fetcher.fetch_font("fake sans", "Bold") == bold
+    assert font_fetcher.refresh_cache() == []
+    assert (len(server.requests), server.not_modified) == (4, 2), "Unchanged searches and archives should 304"
+
+    server.update_family("Fake Sans", ["Regular", "Bold", "Italic"])
+    assert font_fetcher.refresh_cache() == ["Fake Sans"]
+    assert server.not_modified == 3, "Only the archive changed"
+    assert b"Fake Sans Italic" in font_fetcher.fetch_font("Fake Sans", "Italic").read_bytes()
+    assert len(server.requests) == 6, "New styles should be served from the cache"
+    assert font_fetcher.fetch_font_cached("fake sans", "Bold") == bold, "Unchanged files should be kept"
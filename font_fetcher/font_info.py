@@ -0,0 +1,116 @@
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from font_fetcher.style import style_from_filename, style_from_traits, style_traits
+
+FONT_SUFFIXES = (".ttf", ".otf")  # Extensions of the supported font files, in order of preference
+
+_SFNT_VERSIONS = {b"\x00\x01\x00\x00", b"OTTO", b"true"}
+_RIBBI_STYLES = {"regular", "bold", "italic", "bold italic"}
+
+# Name IDs of the name table
+_FAMILY, _SUBFAMILY, _TYPOGRAPHIC_FAMILY, _TYPOGRAPHIC_SUBFAMILY = 1, 2, 16, 17
+
+
+@dataclass
+class FontInfo:
+    """The family name of the font (the typographic one if available, e.g., "Open Sans" for "Open Sans Light")."""
+    family: str
+
+    """The style of the font within its family (e.g., "Light Italic")."""
+    style: str
+
+    """The weight class of the font (e.g., 400 for regular and 700 for bold)."""
+    weight: int
+
+    """Whether the font is italic (or oblique)."""
+    italic: bool
+
+
+def _read_tables(f: BinaryIO) -> Dict[bytes, Tuple[int, int]]:
+    """Reads the table directory of the (first) font of a TTF/OTF/TTC file, as tag -> (offset, length)."""
+    tag = f.read(4)
+    if tag == b"ttcf":  # Collection: use the first font
+        f.seek(12)
+        f.seek(struct.unpack(">I", f.read(4))[0])
+        tag = f.read(4)
+    if tag not in _SFNT_VERSIONS:
+        raise ValueError("not a TrueType/OpenType font")
+    num_tables = struct.unpack(">H", f.read(2))[0]
+    f.read(6)
+    directory = f.read(16 * num_tables)
+    tables = {}
+    for i in range(num_tables):
+        table_tag, _, offset, length = struct.unpack_from(">4sIII", directory, 16 * i)
+        tables[table_tag] = (offset, length)
+    return tables
+
+
+def _read_table(f: BinaryIO, tables: Dict[bytes, Tuple[int, int]], tag: bytes) -> Optional[bytes]:
+    if tag not in tables:
+        return None
+    offset, length = tables[tag]
+    f.seek(offset)
+    return f.read(length)
+
+
+def _name_record_rank(platform_id: int, encoding_id: int, language_id: int) -> Optional[int]:
+    """Ranks the name records that can be decoded (lower is better): Windows English first, then other languages."""
+    if platform_id == 3 and encoding_id in (0, 1, 10):
+        return 0 if language_id == 0x409 else 1
+    if platform_id == 0:
+        return 2
+    if platform_id == 1 and encoding_id == 0:
+        return 3 if language_id == 0 else None
+    return None
+
+
+def _read_names(name_table: bytes) -> Dict[int, str]:
+    _, count, string_offset = struct.unpack_from(">HHH", name_table, 0)
+    names: Dict[int, Tuple[int, str]] = {}
+    for i in range(count):
+        platform_id, encoding_id, language_id, name_id, length, offset = struct.unpack_from(">6H", name_table, 6 + 12 * i)
+        rank = _name_record_rank(platform_id, encoding_id, language_id)
+        if name_id not in (_FAMILY, _SUBFAMILY, _TYPOGRAPHIC_FAMILY, _TYPOGRAPHIC_SUBFAMILY) or rank is None or \
+                (name_id in names and names[name_id][0] <= rank):
+            continue
+        raw = name_table[string_offset + offset:string_offset + offset + length]
+        names[name_id] = (rank, raw.decode("mac_roman" if platform_id == 1 else "utf-16-be", errors="replace"))
+    return {name_id: name.strip() for name_id, (_, name) in names.items() if name.strip()}
+
+
+def read_font_info(path: Path) -> Optional[FontInfo]:
+    """Reads the family, style, weight and italic flag of a TTF/OTF/TTC font file from its name, OS/2 and head tables,
+    or returns None if the file is not a valid font. Only the needed tables are read."""
+    try:
+        with open(path, "rb") as f:
+            tables = _read_tables(f)
+            names = _read_names(_read_table(f, tables, b"name") or b"\0" * 6)
+            os2 = _read_table(f, tables, b"OS/2")
+            head = _read_table(f, tables, b"head")
+    except (OSError, ValueError, struct.error):
+        return None
+    family = names.get(_TYPOGRAPHIC_FAMILY) or names.get(_FAMILY)
+    if family is None:
+        return None
+    subfamily = names.get(_TYPOGRAPHIC_SUBFAMILY) or names.get(_SUBFAMILY) or "Regular"
+
+    weight, italic = style_traits(subfamily)
+    if os2 is not None and len(os2) >= 64:
+        weight = struct.unpack_from(">H", os2, 4)[0] or weight
+        italic = bool(struct.unpack_from(">H", os2, 62)[0] & 0x201)  # ITALIC or OBLIQUE bits of fsSelection
+    elif head is not None and len(head) >= 46:
+        italic = bool(struct.unpack_from(">H", head, 44)[0] & 0x2)  # Italic bit of macStyle
+
+    # Legacy families only distinguish four styles, other weights are then only known from the OS/2 table
+    if _TYPOGRAPHIC_SUBFAMILY not in names and subfamily.lower() in _RIBBI_STYLES:
+        subfamily = style_from_traits(weight, italic)
+    return FontInfo(family=family, style=subfamily, weight=weight, italic=italic)
+
+
+def font_style(path: Path) -> str:
+    """Returns the style of a font file, read from the font itself if possible, otherwise guessed from its name."""
+    info = read_font_info(path)
+    return info.style if info is not None else style_from_filename(path.stem)
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from font_fetcher.font_info import FontInfo, font_style, read_font_info
+from font_fetcher.testing import make_font
+
+
+def test_read_font_info(tmp_path: Path):
+    """Test reading the family and style of fonts, including legacy families with more than four styles."""
+    path = tmp_path / "font.otf"
+    path.write_bytes(make_font({1: "Open Sans Light", 2: "Italic", 16: "Open Sans", 17: "Light Italic"}, 300, 0x1))
+    assert read_font_info(path) == FontInfo(family="Open Sans", style="Light Italic", weight=300, italic=True)
+
+    path.write_bytes(make_font({1: "Open Sans SemiBold", 2: "Regular"}, 600, 0x40))
+    assert read_font_info(path) == FontInfo(family="Open Sans SemiBold", style="Semi Bold", weight=600, italic=False)
+
+    path.write_bytes(b"not a font")
+    assert read_font_info(path) is None
+    assert font_style(tmp_path / "OpenSans-BoldItalic.ttf") == "Bold Italic", "Should fall back to the file name"
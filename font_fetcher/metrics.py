@@ -0,0 +1,141 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from font_fetcher.misc import logger
+
+PHASES = ("search", "parse", "download", "extract", "fetch", "ocp_register")
+"""Timed phases: search requests, parsing of search results, archive downloads, extraction of font files, whole remote
+fetches (including all of the previous phases) and registration of fetched fonts in OCP."""
+
+COUNTERS = ("cache_hits", "cache_misses", "search_cache_hits", "not_found", "bytes_downloaded", "retries",
+            "not_modified")
+"""Counted events: font cache hits and misses, search cache hits, fonts not found in any repository, downloaded archive
+bytes, retried HTTP requests and revalidated responses that did not change."""
+
+MetricsListener = Callable[[str, str, float], None]
+"""Callback receiving every measurement as (kind, name, value): kind is "timing" (value in seconds) or "count"."""
+
+
+@dataclass
+class PhaseStats:
+    """The number of times the phase ran."""
+    count: int = 0
+
+    """The total time (in seconds) spent in the phase."""
+    total: float = 0.0
+
+    """The longest time (in seconds) spent in the phase."""
+    max: float = 0.0
+
+
+class FetchMetrics:
+    """Thread-safe collector of the timings of each fetch phase and of counted events, which also forwards every
+    measurement to the registered listeners (e.g., to export them to a monitoring system)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, PhaseStats] = {}
+        self._counters: Dict[str, float] = {}
+        self._listeners: List[MetricsListener] = []
+
+    def observe(self, phase: str, seconds: float):
+        """Records the time spent in a phase."""
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                stats = self._phases[phase] = PhaseStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+        self._notify("timing", phase, seconds)
+
+    def increment(self, name: str, value: float = 1):
+        """Increments a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._notify("count", name, value)
+
+    def timed(self, phase: str) -> "_Timer":
+        """Returns a context manager recording the time spent in its block as the given phase (even if it raises)."""
+        return _Timer(self, phase)
+
+    def phases(self) -> Dict[str, PhaseStats]:
+        """Returns a copy of the statistics of each phase that ran."""
+        with self._lock:
+            return {phase: PhaseStats(stats.count, stats.total, stats.max) for phase, stats in self._phases.items()}
+
+    def counters(self) -> Dict[str, float]:
+        """Returns a copy of the counters that were incremented."""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Forgets all the recorded measurements (listeners are kept)."""
+        with self._lock:
+            self._phases.clear()
+            self._counters.clear()
+
+    def add_listener(self, listener: MetricsListener):
+        """Registers a callback receiving every measurement as it is recorded, from the thread that recorded it."""
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: MetricsListener):
+        """Unregisters a callback added with add_listener."""
+        with self._lock:
+            self._listeners = [other for other in self._listeners if other is not listener]
+
+    def _notify(self, kind: str, name: str, value: float):
+        for listener in self._listeners:  # Replaced (not mutated) on changes, so no lock is needed to iterate
+            try:
+                listener(kind, name, value)
+            except Exception as e:  # Monitoring must never break fetching
+                logger.warning(f"Metrics listener {listener!r} failed: {e}")
+
+    def to_prometheus(self, prefix: str = "font_fetcher") -> str:
+        """Exports the measurements in the Prometheus text exposition format (e.g., to serve them on /metrics)."""
+        lines = [f"# TYPE {prefix}_phase_seconds summary"]
+        for phase, stats in sorted(self.phases().items()):
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {stats.count}')
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {stats.total!r}')
+        lines.append(f"# TYPE {prefix}_phase_seconds_max gauge")
+        for phase, stats in sorted(self.phases().items()):
+            lines.append(f'{prefix}_phase_seconds_max{{phase="{phase}"}} {stats.max!r}')
+        for name, value in sorted(self.counters().items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_phase", "_start")
+
+    def __init__(self, metrics: FetchMetrics, phase: str):
+        self._metrics = metrics
+        self._phase = phase
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe(self._phase, time.perf_counter() - self._start)
+
+
+def statsd_listener(send: Callable[[str], None], prefix: str = "font_fetcher") -> MetricsListener:
+    """Creates a listener that formats every measurement as a StatsD line (timings in milliseconds) and passes it to
+    send, e.g., a function writing to a UDP socket connected to the StatsD daemon."""
+
+    def listener(kind: str, name: str, value: float):
+        if kind == "timing":
+            send(f"{prefix}.{name}:{value * 1000:.3f}|ms")
+        else:
+            send(f"{prefix}.{name}:{value:g}|c")
+
+    return listener
+
+
+fetch_metrics = FetchMetrics()
+"""The measurements of all fetches of this process."""
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+import font_fetcher
+from font_fetcher.metrics import FetchMetrics, fetch_metrics, statsd_listener
+from font_fetcher.repo_1001fonts import Fonts1001Repo
+from font_fetcher.testing import FakeFamilyRepo, make_archive
+
+
+@pytest.fixture
+def metrics() -> FetchMetrics:
+    fetch_metrics.reset()
+    yield fetch_metrics
+    fetch_metrics.reset()
+
+
+def test_fetch_metrics(fake_repo: FakeFamilyRepo, metrics: FetchMetrics):
+    """Test that cache hits and misses, remote fetches and missing fonts are measured."""
+    events = []
+
+    def listener(kind: str, name: str, _value: float):
+        events.append((kind, name))
+
+    metrics.add_listener(listener)
+    try:
+        font_fetcher.fetch_font("Fake Sans", "Bold")
+        font_fetcher.fetch_font("Fake Sans", "Bold")
+        with pytest.raises(FileNotFoundError):
+            font_fetcher.fetch_font("Missing", "Regular")
+    finally:
+        metrics.remove_listener(listener)
+    assert metrics.counters() == {"cache_hits": 1, "cache_misses": 2, "not_found": 1}
+    assert metrics.phases()["fetch"].count == 2
+    assert ("timing", "fetch") in events and ("count", "cache_hits") in events
+
+
+def test_repo_phase_metrics(tmp_path: Path, metrics: FetchMetrics, fake_repo_server):
+    """Test that each phase of searching and downloading from a repository is timed."""
+    server = fake_repo_server({"Fake Sans": ["Regular", "Bold"]})
+    repo = server.configure_repo(Fonts1001Repo())
+    repo.download_font_family(tmp_path, repo.search_font("Fake Sans")[0])
+    assert {phase: stats.count for phase, stats in metrics.phases().items()} == {
+        "search": 1, "parse": 1, "download": 1, "extract": 1}
+    assert metrics.counters()["bytes_downloaded"] == len(make_archive("Fake Sans", ["Regular", "Bold"]))
+
+
+def test_metrics_export():
+    """Test the Prometheus and StatsD exports."""
+    metrics = FetchMetrics()
+    lines = []
+    metrics.add_listener(statsd_listener(lines.append))
+    metrics.observe("search", 0.25)
+    metrics.observe("search", 0.5)
+    metrics.increment("bytes_downloaded", 1024)
+    assert lines == ["font_fetcher.search:250.000|ms", "font_fetcher.search:500.000|ms",
+                     "font_fetcher.bytes_downloaded:1024|c"]
+    exported = metrics.to_prometheus()
+    assert 'font_fetcher_phase_seconds_count{phase="search"} 2' in exported
+    assert 'font_fetcher_phase_seconds_sum{phase="search"} 0.75' in exported
+    assert 'font_fetcher_phase_seconds_max{phase="search"} 0.5' in exported
+    assert "font_fetcher_bytes_downloaded_total 1024" in exported
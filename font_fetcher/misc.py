@@ -1,3 +1,23 @@
 import logging
+import re
 
 logger = logging.getLogger("font_fetcher")
+
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_AGE_UNITS = {"": 1, "s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+
+
+def parse_size(text: str) -> int:
+    """Parses a size in bytes, with an optional binary unit suffix (e.g., "500M" or "2GiB")."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([kmgt]?)(i?b)?\s*", text.lower())
+    if match is None:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def parse_age(text: str) -> float:
+    """Parses an age in seconds, with an optional unit suffix (e.g., "90m", "12h" or "30d")."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([smhdw]?)\s*", text.lower())
+    if match is None:
+        raise ValueError(f"Invalid age: {text!r}")
+    return float(match.group(1)) * _AGE_UNITS[match.group(2)]
@@ -0,0 +1,64 @@
+from typing import Dict, List, Sequence, Set, Tuple
+
+from font_fetcher.style import split_words
+
+
+def name_words(name: str) -> List[str]:
+    """Splits a font name into lower-case words, also at camelCase boundaries (e.g., "OpenSans" -> ["open", "sans"])."""
+    return [word.lower() for word in split_words(name)]
+
+
+class NameIndex:
+    """Precomputed words of a set of font names (with an inverted index from each word to the names containing it), to
+    rank them against wanted names without comparing every pair of strings.
+
+    Names are ranked by exact match (ignoring case, then also spacing and punctuation), then by the number of wanted
+    words they contain, the number of wanted words that are prefixes of their words (or the other way around, e.g.,
+    "mono" and "monospace"), the number of their other words, the difference in length and finally their order, so that
+    results are deterministic."""
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        self._words = [name_words(name) for name in self.names]
+        self._joined = ["".join(words) for words in self._words]
+        self._postings: Dict[str, List[int]] = {}
+        self._by_joined: Dict[str, List[int]] = {}
+        for i, words in enumerate(self._words):
+            for word in set(words):
+                self._postings.setdefault(word, []).append(i)
+            self._by_joined.setdefault(self._joined[i], []).append(i)
+
+    def _matches(self, wanted_words: Set[str]) -> Tuple[List[int], List[int]]:
+        """Counts the wanted words (exactly and by prefix) that each name contains, visiting only the names that share
+        words (or prefixes) with the wanted name."""
+        exact, prefix = [0] * len(self.names), [0] * len(self.names)
+        for wanted in wanted_words:
+            for i in self._postings.get(wanted, ()):
+                exact[i] += 1
+            prefixed: Set[int] = set()
+            for word, indices in self._postings.items():
+                if word != wanted and (word.startswith(wanted) or wanted.startswith(word)):
+                    prefixed.update(indices)
+            for i in prefixed:
+                prefix[i] += 1
+        return exact, prefix
+
+    def rank(self, name: str) -> List[int]:
+        """Returns the indices of all the names, from the best to the worst match of the wanted name."""
+        wanted_words = name_words(name)
+        wanted_joined = "".join(wanted_words)
+        exact, prefix = self._matches(set(wanted_words))
+        return sorted(range(len(self.names)), key=lambda i: (
+            self._joined[i] != wanted_joined, self.names[i].lower() != name.lower(), -exact[i], -prefix[i],
+            len(set(self._words[i])) - exact[i], abs(len(self._joined[i]) - len(wanted_joined)), i))
+
+    def variants(self, name: str) -> List[int]:
+        """Returns the indices of the names that only spell the wanted name differently: the same words ignoring case,
+        spacing and punctuation (first) or in another order."""
+        wanted_words = name_words(name)
+        wanted_joined = "".join(wanted_words)
+        variants = list(self._by_joined.get(wanted_joined, ()))
+        if wanted_words:
+            shared = set.intersection(*(set(self._postings.get(word, ())) for word in wanted_words))
+            variants += sorted(i for i in shared if set(self._words[i]) == set(wanted_words) and i not in variants)
+        return variants
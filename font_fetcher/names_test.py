@@ -0,0 +1,29 @@
+from font_fetcher.names import NameIndex, name_words
+
+
+def test_name_words():
+    """Test that names are split into lower-case words, also at camelCase boundaries."""
+    assert name_words("OpenSans-Bold") == ["open", "sans", "bold"]
+    assert name_words("IBM Plex Sans 2") == ["ibm", "plex", "sans", "2"]
+
+
+def test_name_index_rank():
+    """Test that exact names come first, then names with more of the wanted words and fewer other words."""
+    names = ["Fake Sans Mono", "Sans Fake Serif", "Unrelated", "FakeSans", "Fake Sans Monospace Bold", "Fakery"]
+    index = NameIndex(names)
+    assert [names[i] for i in index.rank("fake sans")] == [
+        "FakeSans", "Fake Sans Mono", "Sans Fake Serif", "Fake Sans Monospace Bold", "Fakery", "Unrelated"]
+    assert [names[i] for i in index.rank("Fake Sans Mono")][:2] == ["Fake Sans Mono", "Fake Sans Monospace Bold"]
+    spellings = ["OpenSans", "Open-Sans", "open sans"]
+    assert [spellings[i] for i in NameIndex(spellings).rank("Open Sans")] == ["open sans", "OpenSans", "Open-Sans"], \
+        "Names only differing in case should come before other spellings"
+
+
+def test_name_index_variants():
+    """Test that only other spellings of the wanted name are variants, not names with other words."""
+    names = ["Roboto", "Roboto Mono", "Mono Roboto", "RobotoMono", "roboto-mono"]
+    index = NameIndex(names)
+    assert [names[i] for i in index.variants("Roboto Mono")] == ["Roboto Mono", "RobotoMono", "roboto-mono",
+                                                                 "Mono Roboto"]
+    assert [names[i] for i in index.variants("Roboto")] == ["Roboto"]
+    assert index.variants("Roboto Sans") == []
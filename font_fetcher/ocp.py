@@ -1,16 +1,57 @@
+import sys
 from pathlib import Path
-from threading import Lock
-from typing import Dict, Optional
+from threading import Lock, Thread
+from typing import Any, Dict, Iterable, Optional, Tuple
 
-import requests
-
-from font_fetcher import fetch_font_cached
+from font_fetcher import cached_fonts, fetch_font_cached, fetch_fonts
+from font_fetcher.fetch_common import Fetcher
+from font_fetcher.metrics import fetch_metrics
 from font_fetcher.misc import logger
+from font_fetcher.repo import DownloadError
 
 _original_font_mgr = None
 _wrapper_instance = None
 _font_hook_lock = Lock()
 
+# (renamed font name, aspect, strict level) -> resolved font (None if not found), so that repeated lookups of the same
+# font (e.g., for every piece of text of a model) are a dict hit. Fonts that were not found are only memoized while
+# the negative cache remembers them, and fonts that failed to be fetched (e.g., timeouts) are not memoized at all
+_find_font_memo: Dict[Tuple[str, Any, Any], Any] = {}
+_find_font_memo_lock = Lock()
+_NOT_MEMOIZED = object()
+
+
+def _fetch_errors() -> tuple:
+    """Errors of remote fetches that are handled as missing fonts (requests is only checked if it was used)."""
+    requests = sys.modules.get("requests")
+    errors = (FileNotFoundError, TimeoutError, DownloadError)
+    return errors if requests is None else errors + (requests.exceptions.RequestException,)
+
+
+def _memoize_found_font(key: Tuple[str, Any, Any], font_t: Any) -> Any:
+    with _find_font_memo_lock:
+        _find_font_memo[key] = font_t
+    return font_t
+
+
+def _known_missing(font_name: str, style: str, exact_match: bool) -> bool:
+    """Whether the negative cache (which expires and can be invalidated) still remembers the font as not found."""
+    try:
+        Fetcher.current().raise_if_known_missing(font_name, style, exact_match)
+    except FileNotFoundError:
+        return True
+    return False
+
+
+def clear_ocp_font_memo():
+    """
+    Forget the fonts resolved by the hook, so that they are looked up again
+    (e.g., after installing fonts while the hook is installed).
+    """
+    with _find_font_memo_lock:
+        _find_font_memo.clear()
+
+
 # From OCP.Font_FontAspect
 aspect_to_style: Dict[int, str] = {
     1: "Bold",
@@ -18,14 +59,81 @@ aspect_to_style: Dict[int, str] = {
     3: "Bold Italic",
 }
 
+# Aspects registered for each normalized style of a cached family (as named in OCP.Font_FontAspect)
+_style_to_aspect_name: Dict[str, str] = {
+    "regular": "Font_FontAspect_Regular",
+    "bold": "Font_FontAspect_Bold",
+    "italic": "Font_FontAspect_Italic",
+    "bold italic": "Font_FontAspect_BoldItalic",
+}
+
+
+def _register_font_families(families: Dict[str, Dict[str, Path]]) -> int:
+    """
+    Register the Regular/Bold/Italic/Bold Italic files of each family
+    (by font name and style) with the original font manager, one
+    Font_SystemFont per family. Returns the number of registered families.
+    """
+    from OCP.Font import Font_FontAspect, Font_SystemFont
+    from OCP.TCollection import TCollection_AsciiString
+
+    registered = 0
+    with fetch_metrics.timed("ocp_register"):
+        for font_name, styles in families.items():
+            aspect_paths: Dict[str, Path] = {}
+            for style, font_path in styles.items():
+                aspect_name = _style_to_aspect_name.get(" ".join(style.lower().split()))
+                if aspect_name is not None:
+                    aspect_paths.setdefault(aspect_name, font_path)
+            if not aspect_paths:
+                continue
+
+            font_t = Font_SystemFont(TCollection_AsciiString(font_name))
+            for aspect_name, font_path in aspect_paths.items():
+                font_t.SetFontPath(
+                    getattr(Font_FontAspect, aspect_name),
+                    TCollection_AsciiString(str(font_path.absolute())),
+                )
+            _original_font_mgr.RegisterFont(font_t, True)
+            registered += 1
+
+    # Lookups that missed before may be found now.
+    clear_ocp_font_memo()
+    logger.debug(f"Registered {registered} cached font families")
+    return registered
+
+
+def _prefetch_and_register(font_names: Iterable[str], exact_match: bool):
+    """
+    Fetch the given families into the cache and register them
+    (meant to run in a background thread).
+    """
+    font_names = list(font_names)
+    for result in fetch_fonts([(font_name, "Regular") for font_name in font_names], exact_match):
+        if result.error is not None:
+            logger.warning(f"Could not prefetch font '{result.font_name}': {result.error}")
+
+    with _font_hook_lock:
+        if _original_font_mgr is None:
+            return  # Uninstalled meanwhile
+        fonts = cached_fonts()
+        _register_font_families({font_name: fonts[font_name] for font_name in font_names if font_name in fonts})
+
 
 def install_ocp_font_hook(
     fail_on_not_found: bool = False,
     renames: Optional[Dict[str, str]] = None,
     exact_match: bool = True,
-):
+    register_cached: bool = False,
+    prefetch: Optional[Iterable[str]] = None,
+) -> Optional[Thread]:
     """
     Install the OCP.Font_FontMgr patch to auto-download missing fonts.
+
+    With register_cached, all the cached font families are registered at
+    once, so that their lookups never need to reach the hook. The font
+    names in prefetch are fetched (with all of their styles, if possible)
+    and registered by a background thread, which is returned.
     """
     global _original_font_mgr
     global _wrapper_instance
@@ -99,6 +207,19 @@ def install_ocp_font_hook(
                     font_name_orig = theFontName.ToCString()
                     font_name = renames.get(font_name_orig, font_name_orig)
 
+                    style = aspect_to_style.get(
+                        theFontAspect,
+                        "Regular",
+                    )
+
+                    memo_key = (font_name, theFontAspect, _theStrictLevel)
+                    memoized = _find_font_memo.get(memo_key, _NOT_MEMOIZED)
+                    if memoized is not _NOT_MEMOIZED and (
+                        memoized is not None
+                        or _known_missing(font_name, style, exact_match)
+                    ):
+                        return memoized
+
                     font_name_debug = (
                         f"{font_name} (renamed from {font_name_orig})"
                         if font_name != font_name_orig
@@ -124,18 +245,16 @@ def install_ocp_font_hook(
 
                     if font_t is not None:
                         logger.debug(f"Found existing font: {font_name_debug}")
-                        return font_t
-
-                    style = aspect_to_style.get(
-                        theFontAspect,
-                        "Regular",
-                    )
+                        return _memoize_found_font(memo_key, font_t)
 
                     font_path = fetch_font_cached(
                         font_name,
                         style,
+                        exact_match,
                     )
 
+                    fetch_metrics.increment("cache_hits" if font_path is not None else "cache_misses")
+
                     if font_path is None:
                         logger.info(
                             f"Font '{font_name}' with style '{style}' "
@@ -148,7 +267,7 @@ def install_ocp_font_hook(
                                 style,
                                 exact_match,
                             )
-                        except (FileNotFoundError, requests.exceptions.RequestException):
+                        except _fetch_errors() as err_fetch:
                             logger.warning(
                                 f"Could not fetch font '{font_name}' "
                                 f"style '{style}'"
@@ -157,7 +276,10 @@ def install_ocp_font_hook(
                             if fail_on_not_found:
                                 raise
 
-                            return None
+                            if not isinstance(err_fetch, FileNotFoundError):
+                                return None  # Retried by the next lookup
+
+                            return _memoize_found_font(memo_key, None)
 
                     # IMPORTANT:
                     # Register fetched font.
@@ -168,35 +290,36 @@ def install_ocp_font_hook(
                             f"Registering fetched font: {font_path}"
                         )
 
-                        font_t = Font_SystemFont(
-                            TCollection_AsciiString(font_name)
-                        )
+                        with fetch_metrics.timed("ocp_register"):
+                            font_t = Font_SystemFont(
+                                TCollection_AsciiString(font_name)
+                            )
 
-                        # Some OCP versions differ here.
-                        # This signature works for newer bindings.
-                        font_t.SetFontPath(
-                            theFontAspect,
-                            TCollection_AsciiString(
-                                str(font_path.absolute())
-                            ),
-                        )
+                            # Some OCP versions differ here.
+                            # This signature works for newer bindings.
+                            font_t.SetFontPath(
+                                theFontAspect,
+                                TCollection_AsciiString(
+                                    str(font_path.absolute())
+                                ),
+                            )
 
-                        _original_font_mgr.RegisterFont(font_t, True)
+                            _original_font_mgr.RegisterFont(font_t, True)
 
-                        # Re-query after registration to ensure
-                        # internal structures are updated.
-                        font_t = _original_font_mgr.FindFont(
-                            TCollection_AsciiString(font_name),
-                            strict_level,
-                            theFontAspect,
-                            theDoFailMsg,
-                        )
+                            # Re-query after registration to ensure
+                            # internal structures are updated.
+                            font_t = _original_font_mgr.FindFont(
+                                TCollection_AsciiString(font_name),
+                                strict_level,
+                                theFontAspect,
+                                theDoFailMsg,
+                            )
 
                         logger.debug(
                             f"Successfully registered font: {font_name}"
                         )
 
-                    return font_t
+                    return _memoize_found_font(memo_key, font_t)
 
                 def __getattr__(self, name):
                     return getattr(_original_font_mgr, name)
@@ -209,6 +332,19 @@ def install_ocp_font_hook(
                 "Patched OCP Font_FontMgr with auto-download hook."
             )
 
+            if register_cached:
+                _register_font_families(cached_fonts())
+
+            if prefetch is not None:
+                prefetch_thread = Thread(
+                    target=_prefetch_and_register,
+                    args=(prefetch, exact_match),
+                    name="font_fetcher-prefetch",
+                    daemon=True,
+                )
+                prefetch_thread.start()
+                return prefetch_thread
+
         except ImportError as err_import:
             logger.warning(
                 f"Import error ({err_import}). "
@@ -245,5 +381,6 @@ def uninstall_ocp_font_hook():
 
         _original_font_mgr = None
         _wrapper_instance = None
+        clear_ocp_font_memo()
 
         logger.info("Uninstalled OCP Font_FontMgr patch.")
@@ -3,6 +3,7 @@ from typing import Optional
 import pytest
 from OCP.OCP.Font import Font_SystemFont
 
+from font_fetcher import ocp
 from font_fetcher.ocp import install_ocp_font_hook, uninstall_ocp_font_hook
 
 try:  # Skip tests if OCP is not installed (optional dependency)
@@ -38,6 +39,69 @@ def test_install_ocp_font_hook():
     assert last_font is None, "Poppins should not be found after uninstalling the hook"
 
 
+@pytest.mark.skipif(not have_ocp, reason="OCP is not installed")
+def test_ocp_font_hook_memo():
+    """Test that repeated lookups are memoized until the hook is uninstalled."""
+    install_ocp_font_hook(renames={})
+    try:
+        found = do_test_font("Poppins")
+        assert found is not None
+        assert do_test_font("Poppins") is found, "Repeated lookups should return the memoized font"
+        assert do_test_font("Missing Font Name") is None
+        assert len(ocp._find_font_memo) == 2, "Both found and not found fonts should be memoized"
+    finally:
+        uninstall_ocp_font_hook()
+    assert not ocp._find_font_memo, "Uninstalling the hook should forget the memoized fonts"
+
+
+@pytest.mark.skipif(not have_ocp, reason="OCP is not installed")
+def test_ocp_font_hook_memo_failures(fake_repo, monkeypatch):
+    """Test that failed fetches are not memoized, and missing fonts only while the negative cache remembers them."""
+    import font_fetcher
+
+    def time_out(*_args):
+        raise TimeoutError("Search timed out")
+
+    install_ocp_font_hook(renames={})
+    try:
+        assert do_test_font("Missing Font Name") is None
+        assert len(ocp._find_font_memo) == 1, "Missing fonts should be memoized"
+        font_fetcher.invalidate_negative_cache()
+        assert do_test_font("Missing Font Name") is None
+        assert fake_repo.searches == 2, "Missing fonts should be searched again once the negative cache forgets them"
+
+        ocp.clear_ocp_font_memo()
+        font_fetcher.invalidate_negative_cache()
+        monkeypatch.setattr(font_fetcher.Fetcher, "search_font", time_out)
+        assert do_test_font("Missing Font Name") is None
+        assert not ocp._find_font_memo, "Failed fetches should not be memoized"
+    finally:
+        uninstall_ocp_font_hook()
+
+
+@pytest.mark.skipif(not have_ocp, reason="OCP is not installed")
+def test_ocp_font_hook_register_cached(monkeypatch):
+    """Test that cached and prefetched families are registered when installing the hook."""
+    import font_fetcher
+    font_fetcher.fetch_font("Poppins", "Bold")
+
+    lookups = []
+    monkeypatch.setattr(ocp, "fetch_font_cached", lambda *args: lookups.append(args))
+    install_ocp_font_hook(register_cached=True)
+    try:
+        assert do_test_font("Poppins") is not None
+        assert lookups == [], "Registered families should be found without reaching the hook"
+    finally:
+        uninstall_ocp_font_hook()
+
+    install_ocp_font_hook(prefetch=["Open Sans"]).join()
+    try:
+        assert do_test_font("Open Sans") is not None
+        assert lookups == [], "Prefetched families should be found without reaching the hook"
+    finally:
+        uninstall_ocp_font_hook()
+
+
 @pytest.mark.skipif(not have_build123d, reason="build123d is not installed")
 @pytest.mark.parametrize("font_name", ["Poppins", "Open Sans", "Arial"]) # Arial should be renamed to DejaVu Sans
 def test_build123d(font_name):
@@ -13,8 +13,40 @@ class Font:
     styles: List[str] = None
 
 
+class NotModifiedError(Exception):
+    """Raised by repositories when revalidating (see font_fetcher.repo_common.recording_validators) a search or download
+    that did not change since it was last fetched, so that the cached results are kept instead of being transferred
+    again."""
+
+
+class DownloadError(ConnectionError):
+    """Raised by repositories when a download fails: its response is not successful, it is interrupted and can not be
+    resumed, or it exceeds the maximum size (see font_fetcher.repo_http.HttpConfig)."""
+
+
 class FontRepo(ABC):
-    """Abstract base class for font repositories, i.e., sources from which fonts can be fetched."""
+    """Abstract base class for font repositories, i.e., sources from which fonts can be fetched.
+
+    Implementations should perform their HTTP requests through font_fetcher.repo_http.http_get, which pools connections
+    and applies the configured timeouts and retries. Repositories whose servers provide validators (ETag or
+    Last-Modified headers) can support refreshing the cache cheaply through font_fetcher.repo_common.conditional_get,
+    which raises NotModifiedError.
+
+    The async variants of the methods run the blocking ones in worker threads by default. Repositories should override
+    them with non-blocking implementations (see font_fetcher.repo_http.http_get_async) when possible."""
+
+    cache_searches: bool = True
+    """Whether search results are cached (disable it for repositories that are as fast as the search cache)."""
+
+    local: bool = False
+    """Whether the repository serves fonts from local storage, so that it is searched before the remote repositories
+    (which are only searched if it did not match exactly) and never demoted."""
+
+    @property
+    def identity(self) -> str:
+        """Identifies the repository in the persistent caches (e.g., its class and the server it searches), so that the
+        results of differently configured repositories are not mixed up. It must be stable across processes."""
+        return self.__class__.__name__
 
     @abstractmethod
     def search_font(self, font_name: str) -> List[Font]:
@@ -27,3 +59,25 @@ class FontRepo(ABC):
 
         Note that styles should be fuzzy matched and the closest style to the given string should be returned."""
         pass
+
+    def download_font_family(self, out_dir: Path, font: Font) -> List[Path]:
+        """Download all the styles of the font to the specified output directory and return the paths to the font files.
+
+        Repositories that provide whole families at once should implement this, as it allows caching all styles with a
+        single download. Raises NotImplementedError otherwise."""
+        raise NotImplementedError(f"{self.__class__.__name__} does not support downloading whole families")
+
+    async def search_font_async(self, font_name: str) -> List[Font]:
+        """Async variant of search_font."""
+        import asyncio
+        return await asyncio.to_thread(self.search_font, font_name)
+
+    async def download_font_async(self, out_dir: Path, font: Font, style: str = "Regular") -> Path:
+        """Async variant of download_font."""
+        import asyncio
+        return await asyncio.to_thread(self.download_font, out_dir, font, style)
+
+    async def download_font_family_async(self, out_dir: Path, font: Font) -> List[Path]:
+        """Async variant of download_font_family."""
+        import asyncio
+        return await asyncio.to_thread(self.download_font_family, out_dir, font)
@@ -1,13 +1,14 @@
+import asyncio
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from urllib.parse import urljoin, urlencode
 
-import requests
-from bs4 import BeautifulSoup
-
+from font_fetcher.metrics import fetch_metrics
 from font_fetcher.misc import logger
 from font_fetcher.repo import FontRepo, Font
-from font_fetcher.repo_common import _HEADERS, download_font_url, sort_fonts_by_name
+from font_fetcher.repo_1001fonts_parsers import SEARCH_PARSERS, SearchResult, default_parser
+from font_fetcher.repo_common import conditional_get, conditional_get_async, download_font_family_url, \
+    download_font_family_url_async, download_font_url, sort_fonts_by_name
 
 
 class Fonts1001Repo(FontRepo):
@@ -16,31 +17,71 @@ class Fonts1001Repo(FontRepo):
     search_url = "https://www.1001fonts.com/search.html"
     search_url_prefix = "https://little-hill-4bc4.yeicor-cloudflare.workers.dev/?url="
 
+    parser: Optional[str] = None
+    """Name of the backend parsing search pages (see SEARCH_PARSERS), or None for the fastest available one."""
+
+    @property
+    def identity(self) -> str:
+        return f"{self.__class__.__name__}({self.search_url_prefix}{self.search_url})"
+
+    def _search_font_url(self, font_name: str) -> str:
+        return self.search_url_prefix + self.search_url + "?" + urlencode({'search': font_name})  # One page is enough
+
+    def _extract_search_results(self, html: str) -> List[SearchResult]:
+        parser = self.parser or default_parser()
+        try:
+            results = SEARCH_PARSERS[parser](html)
+        except Exception as e:
+            if parser == "bs4":
+                raise
+            logger.warning(f"Could not parse search results with the {parser} parser, falling back to bs4: {e}")
+            return SEARCH_PARSERS["bs4"](html)
+        if not results and parser != "bs4" and "font-list-item" in html:  # Unexpected markup
+            logger.debug(f"No search results found by the {parser} parser, falling back to bs4")
+            return SEARCH_PARSERS["bs4"](html)
+        return results
+
+    def _parse_search_results(self, font_name: str, html: str) -> List[Font]:
+        with fetch_metrics.timed("parse"):
+            fonts = []
+            for name, href in self._extract_search_results(html):
+                if name == "":
+                    logger.info(f"Skipping empty font name in search results for '{font_name}'")
+                    continue
+                if not href:  # urljoin would return the search page itself
+                    logger.info(f"Skipping {font_name} -> {name} as no URL found")
+                    continue
+                font = Font(name=name)
+                font._url = urljoin(self.search_url, href)
+                fonts.append(font)
+
+            return sort_fonts_by_name(font_name, fonts)
+
     def search_font(self, font_name: str) -> List[Font]:
         """Search for a font by its name and return a list of Font objects."""
-        url = self.search_url_prefix + self.search_url + "?" + urlencode(
-            {'search': font_name})  # One page is enough
-        response = requests.get(str(url), headers=_HEADERS)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        font_elements = soup.select('.font-list-item')
-        fonts = []
-        for element in font_elements:
-            name = next(element.select_one('.font-title').stripped_strings)  # Also contains other unwanted children
-            if name == "":
-                logger.info(f"Skipping empty font name in search results for '{font_name}'")
-                continue
-            font = Font(name=name)
-            font._url = urljoin(self.search_url, element.select_one('a.btn-download').get('href'))
-            if not font._url:
-                logger.info(f"Skipping {font_name} -> {name} as no URL found")
-                continue
-            fonts.append(font)
-
-        return sort_fonts_by_name(font_name, fonts)
+        with fetch_metrics.timed("search"):
+            response = conditional_get(self._search_font_url(font_name))
+            response.raise_for_status()
+        return self._parse_search_results(font_name, response.text)
+
+    async def search_font_async(self, font_name: str) -> List[Font]:
+        """Async variant of search_font, using non-blocking HTTP."""
+        with fetch_metrics.timed("search"):
+            response = await conditional_get_async(self._search_font_url(font_name))
+            response.raise_for_status()
+        return await asyncio.to_thread(self._parse_search_results, font_name, response.text)
 
     def download_font(self, out_dir: Path, font: Font, style: str = "Regular") -> Path:
         """Download a specific style of the font to the specified output directory."""
         # noinspection PyUnresolvedReferences,PyProtectedMember
         return download_font_url(out_dir, font, style, self.search_url_prefix + font._url)
+
+    def download_font_family(self, out_dir: Path, font: Font) -> List[Path]:
+        """Download all the styles of the font to the specified output directory."""
+        # noinspection PyUnresolvedReferences,PyProtectedMember
+        return download_font_family_url(out_dir, font, self.search_url_prefix + font._url)
+
+    async def download_font_family_async(self, out_dir: Path, font: Font) -> List[Path]:
+        """Async variant of download_font_family, using non-blocking HTTP."""
+        # noinspection PyUnresolvedReferences,PyProtectedMember
+        return await download_font_family_url_async(out_dir, font, self.search_url_prefix + font._url)
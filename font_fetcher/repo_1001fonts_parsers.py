@@ -0,0 +1,140 @@
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+SearchResult = Tuple[str, Optional[str]]
+"""A result of a 1001fonts search page: the first text of the .font-title element of a .font-list-item (which also
+contains other unwanted text, empty if not found) and the href of its first a.btn-download (None if missing)."""
+
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+                  "track", "wbr"}
+
+
+def _has_class(class_attr: Optional[str], class_name: str) -> bool:
+    return class_attr is not None and class_name in class_attr.split()
+
+
+def parse_bs4(html: str) -> List[SearchResult]:
+    """Builds the whole document tree with BeautifulSoup and the pure-Python html.parser (the slowest backend)."""
+    from bs4 import BeautifulSoup
+
+    results = []
+    for element in BeautifulSoup(html, "html.parser").select(".font-list-item"):
+        title = element.select_one(".font-title")
+        link = element.select_one("a.btn-download")
+        results.append((next(title.stripped_strings, "") if title is not None else "",
+                        link.get("href") if link is not None else None))
+    return results
+
+
+def parse_lxml(html: str) -> List[SearchResult]:
+    """Builds the document tree with the C-backed lxml parser (requires the optional lxml dependency)."""
+    import lxml.html
+
+    def has_class(class_name: str) -> str:
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+    results = []
+    for element in lxml.html.fromstring(html).xpath(f"//*[{has_class('font-list-item')}]"):
+        titles = element.xpath(f".//*[{has_class('font-title')}]")
+        texts = [text.strip() for text in titles[0].xpath(".//text()")] if titles else []
+        links = element.xpath(f".//a[{has_class('btn-download')}]/@href")
+        results.append((next((text for text in texts if text), ""), str(links[0]) if links else None))
+    return results
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _SearchResultsExtractor(HTMLParser):
+    """Extracts the search results while tokenizing the page, without building a tree, and stops at the end of the
+    element containing them (skipping the rest of the page)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.results: List[SearchResult] = []
+        self._stack: List[str] = []  # Open elements
+        self._list_depth: Optional[int] = None  # Depth of the element containing the results
+        self._item_depth: Optional[int] = None  # Depth of the current result
+        self._title_depth: Optional[int] = None  # Depth of the title of the current result, while its name is unknown
+        self._title_seen = False  # Only the first title of each result is used
+        self._name = ""
+        self._href: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        class_attr = dict(attrs).get("class")
+        if self._item_depth is None:
+            if _has_class(class_attr, "font-list-item"):
+                if self._list_depth is None:
+                    self._list_depth = len(self._stack)
+                self._item_depth = len(self._stack) + 1
+                self._name, self._href, self._title_seen = "", None, False
+        elif not self._title_seen and _has_class(class_attr, "font-title"):
+            self._title_depth = len(self._stack) + 1
+            self._title_seen = True
+        elif tag == "a" and self._href is None and _has_class(class_attr, "btn-download"):
+            self._href = dict(attrs).get("href")
+        if tag not in _VOID_ELEMENTS:
+            self._stack.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if tag not in self._stack:
+            return  # Stray end tag
+        while self._stack and self._stack.pop() != tag:  # Also closes the elements left open inside
+            pass
+        depth = len(self._stack)
+        if self._title_depth is not None and depth < self._title_depth:
+            self._title_depth = None
+        if self._item_depth is not None and depth < self._item_depth:
+            self.results.append((self._name, self._href))
+            self._item_depth = self._title_depth = None
+        if self._list_depth is not None and depth < self._list_depth:
+            raise _StopParsing()
+
+    def handle_data(self, data: str):
+        if self._title_depth is not None and data.strip():
+            self._name = data.strip()
+            self._title_depth = None  # Only the first text is the name
+
+    def extract(self, html: str) -> List[SearchResult]:
+        try:
+            self.feed(html)
+            self.close()
+        except _StopParsing:
+            pass
+        if self._item_depth is not None:  # Unterminated result at the end of the page
+            self.results.append((self._name, self._href))
+        return self.results
+
+
+def parse_stream(html: str) -> List[SearchResult]:
+    """Extracts the results with the standard library tokenizer, stopping after the result list."""
+    return _SearchResultsExtractor().extract(html)
+
+
+@lru_cache(maxsize=None)
+def _lxml_installed() -> bool:
+    try:
+        import lxml.html  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+SEARCH_PARSERS: Dict[str, Callable[[str], List[SearchResult]]] = {
+    "lxml": parse_lxml,
+    "stream": parse_stream,
+    "bs4": parse_bs4,
+}
+"""The backends extracting the results of search pages (in page order) by name, from the fastest to the slowest."""
+
+
+def default_parser() -> str:
+    """The fastest backend that can be used: lxml if it is installed, otherwise the streaming extractor."""
+    return "lxml" if _lxml_installed() else "stream"
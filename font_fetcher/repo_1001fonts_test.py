@@ -0,0 +1,87 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from font_fetcher import repo_1001fonts_parsers
+from font_fetcher.repo_1001fonts import Fonts1001Repo
+from font_fetcher.repo_1001fonts_parsers import SEARCH_PARSERS
+from font_fetcher.testing import FakeFontRepoServer, make_search_page
+
+_FIXTURE = (Path(__file__).parent / "testdata" / "1001fonts_search.html").read_text(encoding="utf-8")
+
+
+@pytest.fixture(params=["zip", "tar.gz"])
+def server(request, fake_repo_server) -> FakeFontRepoServer:
+    return fake_repo_server({"Fake Sans": ["Regular", "Bold"], "Fake Sans Mono": ["Regular"]},
+                            archive_format=request.param)
+
+
+def test_search_and_download_offline(server: FakeFontRepoServer, tmp_path: Path):
+    """Test searching and downloading families from a local stand-in of the repository."""
+    repo = server.configure_repo(Fonts1001Repo())
+    fonts = repo.search_font("Fake Sans")
+    assert [font.name for font in fonts[:2]] == ["Fake Sans", "Fake Sans Mono"]
+    assert sorted(path.name for path in repo.download_font_family(tmp_path, fonts[0])) == [
+        "FakeSans-Bold.ttf", "FakeSans-Regular.ttf"]
+    (tmp_path / "bold").mkdir()
+    assert repo.download_font(tmp_path / "bold", fonts[0], "Bold").name == "FakeSans-Bold.ttf"
+
+
+def test_search_and_download_offline_async(server: FakeFontRepoServer, tmp_path: Path):
+    """Test the non-blocking variants against a local stand-in of the repository."""
+    pytest.importorskip("httpx")
+    from font_fetcher.repo_http import close_http_async
+    repo = server.configure_repo(Fonts1001Repo())
+
+    async def search_and_download():
+        try:
+            fonts = await repo.search_font_async("Fake Sans")
+            return fonts[0].name, await repo.download_font_family_async(tmp_path, fonts[0])
+        finally:
+            await close_http_async()
+
+    name, paths = asyncio.run(search_and_download())
+    assert name == "Fake Sans"
+    assert sorted(path.name for path in paths) == ["FakeSans-Bold.ttf", "FakeSans-Regular.ttf"]
+
+
+@pytest.fixture(params=list(SEARCH_PARSERS))
+def parser(request) -> str:
+    if request.param == "lxml":
+        pytest.importorskip("lxml.html")
+    return request.param
+
+
+@pytest.mark.parametrize("page, query", [
+    (_FIXTURE, "sans"),
+    (make_search_page(["Fake Sans", "Fake Sans Mono", "Fake Serif"]), "Fake Sans"),
+    (make_search_page([], filler_items=500), "Missing"),
+], ids=["fixture", "generated", "large"])
+def test_search_parsers(parser: str, page: str, query: str):
+    """Test that every search results parser returns the same fonts as the original bs4 one."""
+    repo, reference = Fonts1001Repo(), Fonts1001Repo()
+    repo.parser, reference.parser = parser, "bs4"
+    fonts = [(font.name, font._url) for font in repo._parse_search_results(query, page)]
+    assert fonts == [(font.name, font._url) for font in reference._parse_search_results(query, page)]
+    if page is _FIXTURE:
+        assert sorted(fonts) == [
+            ("Café Sans & Co", "https://cdn.example.com/download/cafe-sans.zip"),
+            ("Open Sans", "https://www.1001fonts.com/download/open-sans.zip"),
+            ("Sans\xa0Serif", "https://www.1001fonts.com/download/sans-serif.tar.gz")]
+
+
+def test_search_parser_fallback(monkeypatch):
+    """Test that the bs4 parser is used if the selected parser fails or does not understand the markup."""
+    repo = Fonts1001Repo()
+    repo.parser = "stream"
+    monkeypatch.setitem(SEARCH_PARSERS, "stream", lambda html: [])
+    assert [font.name for font in repo._parse_search_results("Open Sans", _FIXTURE)][:1] == ["Open Sans"]
+
+    def fail(html):
+        raise ValueError("Unsupported markup")
+
+    monkeypatch.setitem(SEARCH_PARSERS, "stream", fail)
+    monkeypatch.setattr(repo_1001fonts_parsers, "_lxml_installed", lambda: False)
+    repo.parser = None
+    assert [font.name for font in repo._parse_search_results("Open Sans", _FIXTURE)][:1] == ["Open Sans"]
@@ -1,74 +1,201 @@
-import os
+import asyncio
+import contextvars
 import shutil
+import tarfile
 import tempfile
-from difflib import get_close_matches
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
 
-import requests
-
+from font_fetcher.cache_validators import ValidatorCache
+from font_fetcher.font_info import FONT_SUFFIXES, font_style
+from font_fetcher.metrics import fetch_metrics
 from font_fetcher.misc import logger
-from font_fetcher.repo import Font
-
-_HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-}
+from font_fetcher.names import NameIndex
+from font_fetcher.repo import DownloadError, Font, NotModifiedError
+from font_fetcher.repo_http import http_download, http_download_async, http_get, http_get_async
+from font_fetcher.style import match_style
 
 
 def sort_fonts_by_name(wanted_name: str, font_list: list[Font]) -> list[Font]:
     """Sorts a list of Font objects by their name, prioritizing those that match the wanted name (some repos
-    sort by popularity making matching names appear further down the list)."""
+    sort by popularity making matching names appear further down the list). See NameIndex for the ranking."""
     if not font_list:
         return []
     font_to_name = {font.name.lower(): font for font in font_list}
-    wanted_name = wanted_name.lower()
-    # Sort by exact match first, then by close matches
-    sorted_names = get_close_matches(wanted_name, font_to_name.keys(), n=len(font_to_name), cutoff=0.0)
-    logger.debug(f"Sorted retrieved fonts by name: {sorted_names}")
-    sorted_fonts = [font_to_name[name] for name in sorted_names if name in font_to_name]
+    fonts = list(font_to_name.values())
+    sorted_fonts = [fonts[i] for i in NameIndex([font.name for font in fonts]).rank(wanted_name)]
+    logger.debug(f"Sorted retrieved fonts by name: {[font.name for font in sorted_fonts]}")
     return sorted_fonts
 
 
-def download_font_url(out_dir: Path, font: Font, style: str, url: str) -> Path:
-    """If a repo provides a direct download URL for a compressed font file containing all of its styles,
-    this function can be used to download and extract the font file from the URL."""
-    # Download compressed file to a temporary location
-    tmp_dir = tempfile.TemporaryDirectory()
-    response = requests.get(url, headers=_HEADERS)
-    if response.status_code != 200:
-        raise ConnectionError(f"Failed to download font '{font.name}': {response.status_code}")
-    mime = response.headers["Content-Type"]
-    logger.debug(f"Downloading font '{font.name}' with MIME type '{mime}' from {url}")
-    dl_font_path = Path(tmp_dir.name) / (font.name + "." + {
-        "application/zip": "zip",
-        "application/x-zip-compressed": "zip",
-        "application/x-tar": "tar",
-        "application/gzip": "gz",
-        "application/x-gzip": "gz",
-        "application/x-bzip2": "bz2",
-        "application/x-xz": "xz",
-        "application/x-7z-compressed": "7z",
-    }.get(mime, "zip"))
-
-    # Extract the compressed file
-    logger.debug(f"Extracting '{dl_font_path}' and looking for style '{style}'")
-    with open(dl_font_path, 'wb') as f:
-        f.write(response.content)
-    shutil.unpack_archive(dl_font_path, tmp_dir.name)
-    os.remove(dl_font_path)
-
-    # Fuzzy-find the matching font style
-    font_files = list(
-        [f for f in Path(tmp_dir.name).glob("**/*") if f.is_file() and f.suffix.lower() in {".ttf", ".otf"}])
+def _is_font_member(member_name: str) -> bool:
+    """Whether an archive member is a font file (ignoring macOS resource forks such as "__MACOSX/._Font.ttf")."""
+    basename = member_name.replace("\\", "/").rsplit("/", 1)[-1]
+    return Path(basename).suffix.lower() in FONT_SUFFIXES and not basename.startswith("._")
+
+
+def extract_font_files(archive: BinaryIO, out_dir: Path) -> List[Path]:
+    """Extracts only the font files of a zip or tar (optionally compressed) archive to the output directory, reading
+    the member listing directly from the (seekable) archive stream, and returns the paths to the extracted files.
+
+    Members with duplicate file names are skipped. Raises ValueError for unsupported archive formats."""
+    out_paths = []
+
+    def extract_member(member_name: str, open_member):
+        out_path = out_dir / member_name.replace("\\", "/").rsplit("/", 1)[-1]
+        if out_path in out_paths:
+            logger.debug(f"Skipping duplicate font file name: {member_name}")
+            return
+        with open_member() as src, open(out_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        out_paths.append(out_path)
+
+    if zipfile.is_zipfile(archive):
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in zip_file.infolist():
+                if not info.is_dir() and _is_font_member(info.filename):
+                    extract_member(info.filename, lambda: zip_file.open(info))
+        return out_paths
+
+    archive.seek(0)
+    try:
+        tar_file = tarfile.open(fileobj=archive, mode="r:*")
+    except tarfile.TarError as e:
+        raise ValueError(f"Unsupported archive format: {e}") from e
+    with tar_file:
+        for info in tar_file:  # Streams through the members
+            if info.isfile() and _is_font_member(info.name):
+                extract_member(info.name, lambda: tar_file.extractfile(info))
+    return out_paths
+
+
+_validators: contextvars.ContextVar[Optional[ValidatorCache]] = contextvars.ContextVar("font_fetcher_validators",
+                                                                                        default=None)
+_revalidating = contextvars.ContextVar("font_fetcher_revalidating", default=False)
+
+
+@contextmanager
+def recording_validators(validators: ValidatorCache, revalidate: bool = False):
+    """Records the validators (ETag and Last-Modified headers) of the successful responses of conditional_get and of
+    archive downloads (in this thread or task) in the given cache. If revalidating, the requests are also conditional on
+    the validators recorded when the same URLs were last fetched, so that unchanged responses raise NotModifiedError
+    instead of being transferred."""
+    validators_token, revalidating_token = _validators.set(validators), _revalidating.set(revalidate)
+    try:
+        yield
+    finally:
+        _revalidating.reset(revalidating_token)
+        _validators.reset(validators_token)
+
+
+def _conditional_headers(url: str) -> Dict[str, str]:
+    validators = _validators.get()
+    url_validators = validators.get(url) if validators is not None and _revalidating.get() else None
+    if url_validators is None:
+        return {}
+    headers = {}
+    if "etag" in url_validators:
+        headers["If-None-Match"] = url_validators["etag"]
+    if "last_modified" in url_validators:
+        headers["If-Modified-Since"] = url_validators["last_modified"]
+    return headers
+
+
+def _check_conditional_response(url: str, response):
+    """Raises NotModifiedError for unchanged responses, and records the validators of successful ones (if recording)."""
+    if response.status_code == 304:
+        fetch_metrics.increment("not_modified")
+        logger.debug(f"Not modified since last fetched: {url}")
+        raise NotModifiedError(url)
+    validators = _validators.get()
+    if response.status_code == 200 and validators is not None:
+        validators.add(url, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+def conditional_get(url: str):
+    """Performs a GET request with http_get, recording the validators (ETag and Last-Modified headers) of the response
+    if requested (see recording_validators).
+
+    While revalidating, the request is conditional and NotModifiedError is raised if the response did not change since
+    the validators were recorded."""
+    response = http_get(url, headers=_conditional_headers(url))
+    _check_conditional_response(url, response)
+    return response
+
+
+async def conditional_get_async(url: str):
+    """Async variant of conditional_get, using http_get_async."""
+    response = await http_get_async(url, headers=_conditional_headers(url))
+    _check_conditional_response(url, response)
+    return response
+
+
+def _extract_downloaded_fonts(out_dir: Path, font: Font, archive: BinaryIO) -> List[Path]:
+    # Extract only the font files, directly from the downloaded file
+    try:
+        with fetch_metrics.timed("extract"):
+            font_files = extract_font_files(archive, out_dir)
+    except ValueError as e:
+        raise FileNotFoundError(f"Could not extract the downloaded archive for '{font.name}': {e}") from e
     if not font_files:
         raise FileNotFoundError(f"No font files found in the downloaded archive for '{font.name}'.")
-    matching_files = get_close_matches(style.lower(), [f.name.lower() for f in font_files], n=1, cutoff=0.0)
-    matching_file = next(f for f in font_files if f.name.lower() == matching_files[0])
-    logger.debug(
-        f"Chose '{matching_file.relative_to(tmp_dir.name).name}' for style '{style}' out of: "
-        f"{[f.relative_to(tmp_dir.name).name for f in font_files]}")
-
-    # Move the font file to the output path and  cleanup
-    out_path = out_dir / matching_file.name
-    shutil.move(matching_file, out_path)
-    tmp_dir.cleanup()  # Clean up the temporary directory
+    logger.debug(f"Extracted font files: {[f.name for f in font_files]}")
+    return font_files
+
+
+def _download_archive(out_dir: Path) -> BinaryIO:
+    """Creates the temporary file an archive is streamed to (deleted once closed), next to the extracted fonts."""
+    return tempfile.TemporaryFile(dir=out_dir, prefix=".archive-")
+
+
+def download_font_family_url(out_dir: Path, font: Font, url: str) -> List[Path]:
+    """If a repo provides a direct download URL for a compressed font file containing all of its styles,
+    this function can be used to download and extract all the font files from the URL.
+
+    The archive is streamed to a temporary file (see font_fetcher.repo_http.http_download), so that memory usage does
+    not depend on its size. While revalidating (see recording_validators), NotModifiedError is raised if it did not
+    change."""
+    with _download_archive(out_dir) as archive:
+        with fetch_metrics.timed("download"):
+            response = http_download(url, archive, headers=_conditional_headers(url))
+            _check_conditional_response(url, response)
+            if response.status_code != 200:
+                raise DownloadError(f"Failed to download font '{font.name}': {response.status_code}")
+        logger.debug(f"Downloaded font '{font.name}' with MIME type '{response.headers.get('Content-Type')}' "
+                     f"from {url}")
+        return _extract_downloaded_fonts(out_dir, font, archive)
+
+
+async def download_font_family_url_async(out_dir: Path, font: Font, url: str) -> List[Path]:
+    """Async variant of download_font_family_url, using non-blocking HTTP and extracting in a worker thread."""
+    with _download_archive(out_dir) as archive:
+        with fetch_metrics.timed("download"):
+            response = await http_download_async(url, archive, headers=_conditional_headers(url))
+            _check_conditional_response(url, response)
+            if response.status_code != 200:
+                raise DownloadError(f"Failed to download font '{font.name}': {response.status_code}")
+        logger.debug(f"Downloaded font '{font.name}' with MIME type '{response.headers.get('Content-Type')}' "
+                     f"from {url}")
+        return await asyncio.to_thread(_extract_downloaded_fonts, out_dir, font, archive)
+
+
+def choose_style_file(style: str, font_files: List[Path]) -> Path:
+    """Fuzzy-finds the font file that best matches the given style (read from the font files if possible)."""
+    file_styles = {font_style(f): f for f in reversed(font_files)}
+    matching_file = file_styles[match_style(style, list(file_styles.keys()))]
+    logger.debug(f"Chose '{matching_file.name}' for style '{style}' out of: {[f.name for f in font_files]}")
+    return matching_file
+
+
+def download_font_url(out_dir: Path, font: Font, style: str, url: str) -> Path:
+    """If a repo provides a direct download URL for a compressed font file containing all of its styles,
+    this function can be used to download and extract the font file that best matches the style from the URL."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        font_files = download_font_family_url(Path(tmp_dir), font, url)
+        matching_file = choose_style_file(style, font_files)
+        out_path = out_dir / matching_file.name
+        shutil.move(matching_file, out_path)
     return out_path
@@ -0,0 +1,116 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from font_fetcher.cache_validators import ValidatorCache
+from font_fetcher.repo import DownloadError, Font, NotModifiedError
+from font_fetcher.repo_common import download_font_family_url, extract_font_files, recording_validators, \
+    sort_fonts_by_name
+from font_fetcher.repo_http import configure_http, http_config
+from font_fetcher.testing import make_archive
+
+_MEMBERS = {
+    "Fake Sans/FakeSans-Regular.ttf": b"Regular",
+    "Fake Sans/static/FakeSans-Bold.otf": b"Bold",
+    "Fake Sans/specimen.pdf": b"PDF",
+    "Fake Sans/license/OFL.txt": b"License",
+    "__MACOSX/Fake Sans/._FakeSans-Regular.ttf": b"Resource fork",
+}
+
+
+def _zip_archive() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, data in _MEMBERS.items():
+            zip_file.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar_archive() -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar_file:
+        for name, data in _MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_file.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("archive", [_zip_archive(), _tar_archive()], ids=["zip", "tar.gz"])
+def test_extract_font_files(tmp_path: Path, archive: bytes):
+    """Test that only font files are extracted from archives."""
+    font_files = extract_font_files(io.BytesIO(archive), tmp_path)
+    assert {f.name: f.read_bytes() for f in font_files} == {"FakeSans-Regular.ttf": b"Regular",
+                                                            "FakeSans-Bold.otf": b"Bold"}
+    assert sorted(f.name for f in tmp_path.iterdir()) == ["FakeSans-Bold.otf", "FakeSans-Regular.ttf"]
+
+
+def test_extract_font_files_unsupported(tmp_path: Path):
+    """Test that unsupported archives are reported."""
+    with pytest.raises(ValueError):
+        extract_font_files(io.BytesIO(b"7z\xbc\xaf\x27\x1c not really"), tmp_path)
+
+
+def test_sort_fonts_by_name():
+    """Test that the font whose name matches exactly (ignoring case) is sorted first, before other spellings."""
+    fonts = [Font(name="OpenSans"), Font(name="Open-Sans"), Font(name="Open Sans Condensed"), Font(name="open sans")]
+    assert [font.name for font in sort_fonts_by_name("Open Sans", fonts)] == [
+        "open sans", "OpenSans", "Open-Sans", "Open Sans Condensed"]
+
+
+@pytest.fixture
+def http_settings():
+    """Restores the HTTP configuration changed by a test."""
+    original = http_config()
+    yield
+    configure_http(**vars(original))
+
+
+@pytest.mark.parametrize("validators", [True, False], ids=["resumed", "restarted"])
+def test_download_interrupted(tmp_path: Path, http_settings, fake_repo_server, validators: bool):
+    """Test that interrupted downloads are resumed with Range requests if possible, or restarted otherwise."""
+    configure_http(download_chunk_size=100)  # The bytes of the chunk being read when interrupted are lost
+    server = fake_repo_server({"Fake Sans": ["Regular", "Bold"]}, validators=validators, interruptions=1,
+                              interrupt_after=1000)
+    url = server.base_url + "/download/fake-sans.zip"
+    font_files = download_font_family_url(tmp_path, Font(name="Fake Sans"), url)
+    assert sorted(path.name for path in font_files) == ["FakeSans-Bold.ttf", "FakeSans-Regular.ttf"]
+    assert server.ranges == (["bytes=1000-"] if validators else [])
+    assert len(server.requests) == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["FakeSans-Bold.ttf", "FakeSans-Regular.ttf"], \
+        "The archive should be deleted"
+
+
+def test_download_progress_and_limit(tmp_path: Path, http_settings, fake_repo_server):
+    """Test that downloads are streamed in chunks reporting their progress, and limited in size."""
+    progress = []
+    archive_size = len(make_archive("Fake Sans", ["Regular", "Bold"]))
+    configure_http(download_chunk_size=4096, download_progress=progress.append)
+    server = fake_repo_server({"Fake Sans": ["Regular", "Bold"]})
+    url = server.base_url + "/download/fake-sans.zip"
+    download_font_family_url(tmp_path, Font(name="Fake Sans"), url)
+    assert len(progress) == -(-archive_size // 4096)
+    assert (progress[-1].url, progress[-1].downloaded, progress[-1].total) == (url, archive_size, archive_size)
+    assert progress[-1].throughput > 0
+
+    configure_http(max_download_size=archive_size - 1)
+    with pytest.raises(DownloadError):
+        download_font_family_url(tmp_path, Font(name="Fake Sans"), url)
+
+
+def test_recording_validators(tmp_path: Path, fake_repo_server):
+    """Test that validators are only recorded in the given cache, and that revalidating unchanged archives raises."""
+    validators = ValidatorCache(tmp_path)
+    (tmp_path / "out").mkdir()
+    server = fake_repo_server({"Fake Sans": ["Regular"]}, validators=True)
+    url = server.base_url + "/download/fake-sans.zip"
+    download_font_family_url(tmp_path / "out", Font(name="Fake Sans"), url)
+    assert validators.get(url) is None, "Validators should not be recorded without a cache"
+    with recording_validators(validators):
+        download_font_family_url(tmp_path / "out", Font(name="Fake Sans"), url)
+    assert validators.get(url) is not None
+    with recording_validators(validators, revalidate=True), pytest.raises(NotModifiedError):
+        download_font_family_url(tmp_path / "out", Font(name="Fake Sans"), url)
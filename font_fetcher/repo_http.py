@@ -0,0 +1,325 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
+from typing import BinaryIO, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from font_fetcher.metrics import fetch_metrics
+from font_fetcher.misc import logger, parse_size
+from font_fetcher.repo import DownloadError
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+DEFAULT_MAX_DOWNLOAD_SIZE: Optional[int] = parse_size(os.getenv("FONT_FETCHER_MAX_DOWNLOAD_SIZE", "512M")) or None
+"""Default maximum size (in bytes) of downloaded archives, or None (zero in the environment variable) for no limit."""
+
+
+@dataclass
+class DownloadProgress:
+    """The downloaded URL."""
+    url: str
+
+    """The number of bytes of the file downloaded so far (including the parts downloaded before resuming)."""
+    downloaded: int
+
+    """The total size of the file (in bytes), or None if the server did not report it."""
+    total: Optional[int]
+
+    """The time (in seconds) since the download started."""
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """The average download speed so far (in bytes per second)."""
+        return self.downloaded / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    """Configuration of the HTTP session layer shared by all repositories."""
+
+    """Seconds to wait for a connection to be established."""
+    connect_timeout: float = 10.0
+
+    """Seconds to wait between bytes received from the server."""
+    read_timeout: float = 60.0
+
+    """Number of retries for idempotent requests that failed to connect or returned a transient error status."""
+    retries: int = 3
+
+    """Exponential backoff factor (in seconds) between retries."""
+    backoff_factor: float = 0.5
+
+    """Maximum number of pooled (keep-alive) connections per host."""
+    pool_maxsize: int = 10
+
+    """Maximum size (in bytes) of downloaded archives (None for no limit). Larger downloads are aborted."""
+    max_download_size: Optional[int] = DEFAULT_MAX_DOWNLOAD_SIZE
+
+    """Size (in bytes) of the chunks in which downloads are streamed to disk, bounding the memory used by each one."""
+    download_chunk_size: int = 64 * 1024
+
+    """Callback receiving the DownloadProgress of each download after every chunk (None to disable)."""
+    download_progress: Optional[Callable[[DownloadProgress], None]] = None
+
+
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_config = HttpConfig()
+_adapter: Optional[HTTPAdapter] = None
+_generation = 0
+_lock = threading.Lock()
+_local = threading.local()
+_async_clients = weakref.WeakKeyDictionary()  # Event loop -> (generation, httpx.AsyncClient)
+
+
+def configure_http(**kwargs) -> HttpConfig:
+    """Updates the HTTP configuration (see HttpConfig for the available options) and returns the new configuration.
+
+    Connections pooled with the previous configuration are closed."""
+    global _config, _adapter, _generation
+    with _lock:
+        _config = replace(_config, **kwargs)
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
+        _generation += 1
+        return _config
+
+
+def http_config() -> HttpConfig:
+    """Returns the current HTTP configuration."""
+    return _config
+
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            retry = Retry(
+                total=_config.retries,
+                backoff_factor=_config.backoff_factor,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                raise_on_status=False,
+            )
+            _adapter = HTTPAdapter(pool_maxsize=_config.pool_maxsize, max_retries=retry)
+        return _adapter
+
+
+def get_session() -> requests.Session:
+    """Returns the HTTP session of the current thread.
+
+    Sessions are per-thread (they are not fully thread-safe), but all of them share the same connection pools."""
+    session = getattr(_local, "session", None)
+    if session is None or _local.generation != _generation:
+        session = requests.Session()
+        session.headers.update(_HEADERS)
+        adapter = _get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session, _local.generation = session, _generation
+    return session
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """Performs a GET request using the shared session layer, with the configured timeouts and retries."""
+    kwargs.setdefault("timeout", (_config.connect_timeout, _config.read_timeout))
+    logger.debug(f"GET {url}")
+    response = get_session().get(url, **kwargs)
+    retries = len(getattr(getattr(response.raw, "retries", None), "history", ()))  # Retried by urllib3
+    if retries:
+        fetch_metrics.increment("retries", retries)
+    return response
+
+
+class _Download:
+    """State of a download streamed to a file, which may be resumed after an interrupted transfer."""
+
+    def __init__(self, url: str, file: BinaryIO):
+        self.url = url
+        self.file = file
+        self.start = time.perf_counter()
+        self.downloaded = 0
+        self.transferred = 0  # Including the bytes discarded when restarting
+        self.total: Optional[int] = None
+        self.if_range: Optional[str] = None  # Validator of the file being downloaded, if the server accepts ranges
+
+    def begin(self, status: int, headers) -> bool:
+        """Handles the headers of a response, returning whether it is the start (or the continuation) of the file."""
+        if status == 206 and self.downloaded > 0:
+            content_range = headers.get("Content-Range", "")
+            if content_range.startswith(f"bytes {self.downloaded}-"):
+                logger.debug(f"Resuming download of {self.url} from byte {self.downloaded}")
+                return True
+            raise DownloadError(f"Unexpected range in resumed download of {self.url}: {content_range}")
+        if status != 200:
+            return False
+        if self.downloaded > 0:
+            logger.debug(f"Server did not resume the download of {self.url}, restarting")
+            self.file.seek(0)
+            self.file.truncate()
+            self.downloaded = 0
+        length = headers.get("Content-Length")
+        self.total = int(length) if length is not None and length.isdigit() else None
+        validator = headers.get("ETag") or headers.get("Last-Modified")
+        self.if_range = validator if headers.get("Accept-Ranges") == "bytes" and validator and \
+            not validator.startswith("W/") else None  # Weak ETags can not be used in If-Range
+        self._check_size(self.total or 0)
+        return True
+
+    def write(self, chunk: bytes):
+        self._check_size(self.downloaded + len(chunk))
+        self.file.write(chunk)
+        self.downloaded += len(chunk)
+        self.transferred += len(chunk)
+        progress = _config.download_progress
+        if progress is not None:
+            progress(DownloadProgress(self.url, self.downloaded, self.total, time.perf_counter() - self.start))
+
+    def _check_size(self, size: int):
+        if _config.max_download_size is not None and size > _config.max_download_size:
+            raise DownloadError(f"Download of {self.url} exceeds the maximum size of {_config.max_download_size} bytes")
+
+    @property
+    def incomplete(self) -> bool:
+        return self.total is not None and self.downloaded < self.total
+
+    def resume_headers(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """The headers of the request to start, resume or restart (if it can not be resumed) the download."""
+        headers = {**(headers or {}), "Accept-Encoding": "identity"}  # Sizes and ranges of the file itself
+        if self.if_range is not None and self.downloaded > 0:
+            headers.update({"Range": f"bytes={self.downloaded}-", "If-Range": self.if_range})
+            headers.pop("If-None-Match", None)  # The file is being downloaded, it was modified
+            headers.pop("If-Modified-Since", None)
+        return headers
+
+    def finish(self):
+        fetch_metrics.increment("bytes_downloaded", self.transferred)
+        logger.debug(f"Downloaded {self.downloaded} bytes from {self.url} in {time.perf_counter() - self.start:.3f}s")
+
+
+def http_download(url: str, file: BinaryIO, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+    """Downloads a URL into a (binary, seekable) file using the shared session layer, streaming it in chunks of the
+    configured size (see HttpConfig) so that large archives are never fully held in memory.
+
+    Interrupted transfers are resumed with Range requests when the server supports them (restarted otherwise), up to
+    the configured number of retries. Raises DownloadError if the download fails or exceeds the configured maximum size.
+
+    Returns the response, whose body was consumed. Only successful (200) responses are written to the file."""
+    kwargs.setdefault("timeout", (_config.connect_timeout, _config.read_timeout))
+    download = _Download(url, file)
+    first_response = None
+    for attempt in range(_config.retries + 1):
+        request_headers = download.resume_headers(headers)
+        logger.debug(f"GET {url} (streamed)")
+        with get_session().get(url, headers=request_headers, stream=True, **kwargs) as response:
+            retries = len(getattr(getattr(response.raw, "retries", None), "history", ()))
+            if retries:
+                fetch_metrics.increment("retries", retries)
+            if not download.begin(response.status_code, response.headers):
+                if download.transferred == 0:
+                    return response
+                raise DownloadError(f"Failed to resume the download of {url}: {response.status_code}")
+            first_response = response if first_response is None else first_response
+            try:
+                for chunk in response.iter_content(_config.download_chunk_size):
+                    download.write(chunk)
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                if attempt == _config.retries:
+                    raise
+                logger.debug(f"Download of {url} interrupted after {download.downloaded} bytes: {e}")
+                continue
+        if not download.incomplete:
+            break
+        if attempt == _config.retries:
+            raise DownloadError(f"Download of {url} ended after {download.downloaded} of {download.total} bytes")
+    download.finish()
+    return first_response
+
+
+def _get_async_client():
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(f"Async fetching requires httpx ({e}). Install font-fetcher[async].") from e
+
+    loop = asyncio.get_running_loop()
+    generation, client = _async_clients.get(loop, (None, None))
+    if client is None or generation != _generation:
+        client = httpx.AsyncClient(
+            headers=_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(_config.read_timeout, connect=_config.connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=_config.pool_maxsize),
+            transport=httpx.AsyncHTTPTransport(retries=_config.retries),  # Only retries failed connections
+        )
+        _async_clients[loop] = (_generation, client)
+    return client
+
+
+async def http_get_async(url: str, **kwargs):
+    """Async variant of http_get, using a non-blocking httpx client shared by all requests of the running event loop.
+
+    Requires the optional httpx dependency. Returns an httpx.Response, which mostly behaves like a requests.Response."""
+    client = _get_async_client()
+    logger.debug(f"GET {url} (async)")
+    for attempt in range(_config.retries + 1):
+        response = await client.get(url, **kwargs)
+        if response.status_code not in _RETRY_STATUSES or attempt == _config.retries:
+            return response
+        logger.debug(f"Retrying GET {url} after status {response.status_code}")
+        fetch_metrics.increment("retries")
+        await asyncio.sleep(_config.backoff_factor * (2 ** attempt))
+
+
+async def http_download_async(url: str, file: BinaryIO, headers: Optional[Dict[str, str]] = None, **kwargs):
+    """Async variant of http_download, using the non-blocking httpx client of http_get_async."""
+    import httpx
+
+    client = _get_async_client()
+    download = _Download(url, file)
+    first_response = None
+    for attempt in range(_config.retries + 1):
+        logger.debug(f"GET {url} (async, streamed)")
+        async with client.stream("GET", url, headers=download.resume_headers(headers), **kwargs) as response:
+            if response.status_code in _RETRY_STATUSES and attempt < _config.retries:
+                logger.debug(f"Retrying GET {url} after status {response.status_code}")
+                fetch_metrics.increment("retries")
+                await asyncio.sleep(_config.backoff_factor * (2 ** attempt))
+                continue
+            if not download.begin(response.status_code, response.headers):
+                if download.transferred == 0:
+                    return response
+                raise DownloadError(f"Failed to resume the download of {url}: {response.status_code}")
+            first_response = response if first_response is None else first_response
+            try:
+                async for chunk in response.aiter_bytes(_config.download_chunk_size):
+                    download.write(chunk)
+            except httpx.TransportError as e:
+                if attempt == _config.retries:
+                    raise
+                logger.debug(f"Download of {url} interrupted after {download.downloaded} bytes: {e}")
+                continue
+        if not download.incomplete:
+            break
+        if attempt == _config.retries:
+            raise DownloadError(f"Download of {url} ended after {download.downloaded} of {download.total} bytes")
+    download.finish()
+    return first_response
+
+
+async def close_http_async():
+    """Closes the pooled connections of the running event loop (call it before closing the loop)."""
+    _, client = _async_clients.pop(asyncio.get_running_loop(), (None, None))
+    if client is not None:
+        await client.aclose()
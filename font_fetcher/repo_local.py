@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from font_fetcher.cache_blobs import blob_ref
+from font_fetcher.cache_index import CacheIndex
+from font_fetcher.font_info import FONT_SUFFIXES
+from font_fetcher.misc import logger
+from font_fetcher.repo import Font, FontRepo
+from font_fetcher.repo_common import sort_fonts_by_name
+from font_fetcher.style import match_style
+
+PACK_MANIFEST = "pack.json"
+PACK_VERSION = 1
+
+
+def _file_stem(font_name: str, style: str) -> str:
+    """Names font files so that their style is recovered by style_from_filename (e.g., "OpenSans-BoldItalic")."""
+    return f"{font_name.replace(' ', '')}-{style.replace(' ', '')}"
+
+
+def write_pack(pack_path: Path, fonts: Dict[str, Dict[str, Path]], complete: Iterable[str] = ()) -> int:
+    """Atomically writes a pack file (a zip archive with a manifest) containing the given font files, by font name and
+    style. The font names in complete are families whose files are all of their styles (e.g., downloaded as a whole).
+
+    Returns the number of font files written (files shared by several styles are only written once)."""
+    complete = set(complete)
+    manifest = {"version": PACK_VERSION, "families": {}}
+    members: Dict[Path, str] = {}
+    fd, tmp_path = tempfile.mkstemp(dir=pack_path.parent, prefix=f".{pack_path.name}-", suffix=".tmp")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as pack:
+            for font_name, styles in sorted(fonts.items()):
+                family = manifest["families"][font_name] = {"complete": font_name in complete, "styles": {}}
+                for style, path in sorted(styles.items()):
+                    if path not in members:
+                        members[path] = f"fonts/{len(members)}{path.suffix.lower()}"
+                        pack.write(path, members[path])
+                    family["styles"][style] = members[path]
+            pack.writestr(PACK_MANIFEST, json.dumps(manifest, indent=1))
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(members)
+
+
+class LocalFontRepo(FontRepo):
+    """Repository serving fonts from a local directory or pack file, e.g., to fetch fonts without network access.
+
+    Pack files are written by write_pack (see font_fetcher.export_cache_pack). Directories may contain the same files
+    as an extracted pack, be a copied cache directory, or just contain font files named "<Family>-<Style>.ttf"."""
+
+    cache_searches = False  # Searching is as fast as looking up the search cache
+    local = True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._families: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self.path)!r})"
+
+    @property
+    def identity(self) -> str:
+        return f"{self.__class__.__name__}({self.path.resolve()})"
+
+    def _index(self) -> Dict[str, dict]:
+        """Returns the families of the repository (loaded once), as in the manifest of pack files."""
+        with self._lock:
+            if self._families is None:
+                self._families = self._load_index()
+                logger.debug(f"Loaded {len(self._families)} font families from {self}")
+            return self._families
+
+    def _load_index(self) -> Dict[str, dict]:
+        if self.path.is_dir():
+            if (self.path / PACK_MANIFEST).is_file():
+                manifest = json.loads((self.path / PACK_MANIFEST).read_text(encoding="utf-8"))
+            elif (self.path / CacheIndex.basename).is_file():
+                return self._load_cache_index()
+            else:
+                return self._scan_dir()
+        else:
+            with zipfile.ZipFile(self.path) as pack:
+                manifest = json.loads(pack.read(PACK_MANIFEST))
+        if manifest.get("version") != PACK_VERSION:
+            raise ValueError(f"Unsupported font pack version: {self.path}")
+        return manifest["families"]
+
+    def _load_cache_index(self) -> Dict[str, dict]:
+        index = CacheIndex(self.path)
+        families: Dict[str, dict] = {}
+        for font_name, styles in index.fonts().items():
+            family = index.family(font_name)  # Only the styles of the family, not the requested styles resolved to them
+            families[font_name] = {"complete": family is not None, "styles": {
+                style: blob_ref(self.path, path) for style, path in (family or styles).items()}}
+        return families
+
+    def _scan_dir(self) -> Dict[str, dict]:
+        families: Dict[str, dict] = {}
+        for suffix in reversed(FONT_SUFFIXES):  # Preferred suffixes overwrite the others
+            for path in self.path.glob("*" + suffix):
+                font_name, _, style = path.stem.rpartition("-")
+                if font_name and path.is_file():
+                    family = families.setdefault(font_name, {"complete": True, "styles": {}})
+                    family["styles"][style] = path.name
+        return families
+
+    def _copy_member(self, member: str, out_path: Path) -> Path:
+        if self.path.is_dir():
+            shutil.copyfile(self.path / member, out_path)
+        else:
+            with zipfile.ZipFile(self.path) as pack, pack.open(member) as src, open(out_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        return out_path
+
+    def fonts(self) -> List[Font]:
+        """Returns all the font families of the repository."""
+        return [Font(name=font_name, styles=list(family["styles"])) for font_name, family in self._index().items()]
+
+    def search_font(self, font_name: str) -> List[Font]:
+        """Search for a font by its name and return a list of Font objects with similar names, sorted by relevance."""
+        words = font_name.lower().split()
+        fonts = [font for font in self.fonts() if all(word in font.name.lower() for word in words)]
+        return sort_fonts_by_name(font_name, fonts)
+
+    def download_font(self, out_dir: Path, font: Font, style: str = "Regular") -> Path:
+        """Copy the style of the font closest to the given one to the specified output directory."""
+        styles = self._index()[font.name]["styles"]
+        file_style = match_style(style, list(styles.keys()))
+        member = styles[file_style]
+        return self._copy_member(member, out_dir / (_file_stem(font.name, file_style) + Path(member).suffix))
+
+    def download_font_family(self, out_dir: Path, font: Font) -> List[Path]:
+        """Copy all the styles of the font to the specified output directory (if all of them are known)."""
+        family = self._index()[font.name]
+        if not family["complete"]:
+            raise NotImplementedError(f"Only some styles of '{font.name}' are available in {self}")
+        return [self._copy_member(member, out_dir / (_file_stem(font.name, style) + Path(member).suffix))
+                for style, member in family["styles"].items()]
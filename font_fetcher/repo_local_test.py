@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import font_fetcher
+from font_fetcher.testing import FakeFamilyRepo
+from font_fetcher.repo_local import LocalFontRepo
+from font_fetcher.repo_stats import repo_stats_table
+
+
+def test_cache_pack_round_trip(fake_repo: FakeFamilyRepo, tmp_path: Path, monkeypatch):
+    """Test that exported packs are served by a LocalFontRepo and can be imported into another cache."""
+    font_fetcher.fetch_font("Fake Sans", "Bold")
+    pack_path = tmp_path.parent / f"{tmp_path.name}-fonts.pack"
+    assert font_fetcher.export_cache_pack(pack_path) == 4
+
+    local_repo = LocalFontRepo(pack_path)
+    fonts = local_repo.search_font("fake sans")
+    assert [font.name for font in fonts] == ["Fake Sans"]
+    assert sorted(fonts[0].styles) == ["Bold", "Bold Italic", "Italic", "Regular"]
+    (tmp_path / "out").mkdir()
+    assert local_repo.download_font(tmp_path / "out", fonts[0], "bold italic").read_bytes() == b"BoldItalic"
+
+    monkeypatch.setattr(font_fetcher, "_CACHE_DIR", tmp_path / "other-cache")
+    assert font_fetcher.import_cache_pack(pack_path) == 1
+    assert font_fetcher.import_cache_pack(pack_path) == 0, "Cached families should not be imported again"
+    assert font_fetcher.fetch_font("Fake Sans", "Italic").read_bytes() == b"Italic"
+    assert fake_repo.downloads == 1, "Imported fonts should not be downloaded again"
+
+    copied_cache_repo = LocalFontRepo(tmp_path / "other-cache")
+    assert sorted(copied_cache_repo.search_font("Fake Sans")[0].styles) == ["Bold", "Bold Italic", "Italic", "Regular"]
+
+
+def test_local_repo_directory(fake_repo: FakeFamilyRepo, tmp_path: Path, monkeypatch):
+    """Test that a directory of font files is searched first and served without other repositories."""
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    for style in ["Regular", "Bold"]:
+        (mirror / f"Mirrored Sans-{style}.ttf").write_bytes(style.encode())
+    monkeypatch.setattr(font_fetcher, "_CACHE_DIR", tmp_path / "cache")
+    font_fetcher._repo_registry().insert(0, LocalFontRepo(mirror))
+
+    assert font_fetcher.fetch_font("Mirrored Sans", "Bold").read_bytes() == b"Bold"
+    assert font_fetcher.fetch_font("Mirrored Sans", "Regular").read_bytes() == b"Regular"
+    assert fake_repo.downloads == 0
+
+
+def test_local_repo_priority(fake_repo: FakeFamilyRepo, tmp_path: Path, monkeypatch):
+    """Test that local repositories are searched before remote ones, even if registered last and rarely matching."""
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    (mirror / "Fake Sans-Bold.ttf").write_bytes(b"Mirrored Bold")
+    monkeypatch.setattr(font_fetcher, "_CACHE_DIR", tmp_path / "cache")
+    local_repo = LocalFontRepo(mirror)
+    font_fetcher._repo_registry().append(local_repo)
+    for _ in range(10):
+        repo_stats_table.record_search(local_repo, 0.1, hit=False)
+
+    assert font_fetcher.fetch_font("Fake Sans", "Bold").read_bytes() == b"Mirrored Bold"
+    assert fake_repo.searches == 0, "Remote repositories should not be searched if a local one matched exactly"
@@ -1,3 +1,5 @@
-from font_fetcher.repo_1001fonts import Fonts1001Repo
-
-repo_registry = [Fonts1001Repo()]
+def __getattr__(name: str):
+    if name == "repo_registry":  # Backwards compatible alias of the registered repositories (see font_fetcher)
+        from font_fetcher import _repo_registry
+        return _repo_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
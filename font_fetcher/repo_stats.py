@@ -0,0 +1,95 @@
+import os
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence, Tuple
+
+from font_fetcher.repo import FontRepo
+
+DEFAULT_REPO_TIMEOUT = float(os.getenv("FONT_FETCHER_REPO_TIMEOUT", 30))
+"""Default time (in seconds) to wait for the search of each repository. Zero or negative disables the timeout."""
+
+_MIN_SEARCHES = 10  # Searches of a repository before its statistics are trusted to demote it
+_MIN_HIT_RATE = 0.05  # Repositories matching less often than this are demoted
+_MAX_FAILURE_RATE = 0.5  # Repositories failing (or timing out) more often than this are demoted
+_LATENCY_SMOOTHING = 0.2  # Weight of the latest search in the moving average of the latency
+
+
+@dataclass
+class RepoStats:
+    """The number of completed searches."""
+    searches: int = 0
+
+    """The number of searches whose first result exactly matched the searched font name."""
+    hits: int = 0
+
+    """The number of searches that failed or timed out."""
+    failures: int = 0
+
+    """The exponential moving average of the search latency (in seconds), or None if no search completed."""
+    latency: Optional[float] = None
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of attempted searches that matched (optimistically 1 before the first attempt)."""
+        attempts = self.searches + self.failures
+        return self.hits / attempts if attempts else 1.0
+
+    @property
+    def failure_rate(self) -> float:
+        """The fraction of attempted searches that failed or timed out."""
+        attempts = self.searches + self.failures
+        return self.failures / attempts if attempts else 0.0
+
+    @property
+    def demoted(self) -> bool:
+        """Whether the repository rarely matches or often fails, so that it is only searched if others did not match."""
+        return self.searches + self.failures >= _MIN_SEARCHES and (
+                self.hit_rate < _MIN_HIT_RATE or self.failure_rate > _MAX_FAILURE_RATE)
+
+
+class RepoStatsTable:
+    """Thread-safe statistics of the searches of each repository (in this process), used to search the slow or rarely
+    matching repositories last."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = weakref.WeakKeyDictionary()  # FontRepo -> RepoStats
+
+    def record_search(self, repo: FontRepo, seconds: float, hit: bool):
+        """Records a completed search."""
+        with self._lock:
+            stats = self._stats.setdefault(repo, RepoStats())
+            stats.searches += 1
+            stats.hits += hit
+            stats.latency = seconds if stats.latency is None else \
+                _LATENCY_SMOOTHING * seconds + (1 - _LATENCY_SMOOTHING) * stats.latency
+
+    def record_failure(self, repo: FontRepo):
+        """Records a search that failed or timed out."""
+        with self._lock:
+            self._stats.setdefault(repo, RepoStats()).failures += 1
+
+    def get(self, repo: FontRepo) -> RepoStats:
+        """Returns a copy of the statistics of a repository."""
+        with self._lock:
+            return replace(self._stats.get(repo, RepoStats()))
+
+    def reset(self):
+        """Forgets the statistics of all repositories."""
+        with self._lock:
+            self._stats.clear()
+
+    def order(self, repos: Sequence[FontRepo]) -> Tuple[List[FontRepo], List[FontRepo], List[FontRepo]]:
+        """Splits the repositories into the local ones (see FontRepo.local, in registration order and never demoted),
+        the preferred remote ones and the demoted remote ones, the latter sorted from the most to the least promising
+        (by hit rate, failure rate and latency), keeping the registration order for ties."""
+        stats = {repo: self.get(repo) for repo in repos if not repo.local}
+        ranked = sorted(stats, key=lambda repo: (-stats[repo].hit_rate, stats[repo].failure_rate,
+                                                 stats[repo].latency or 0.0))
+        return ([repo for repo in repos if repo.local], [repo for repo in ranked if not stats[repo].demoted],
+                [repo for repo in ranked if stats[repo].demoted])
+
+
+repo_stats_table = RepoStatsTable()
+"""The search statistics of all repositories in this process."""
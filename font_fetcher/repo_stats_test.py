@@ -0,0 +1,20 @@
+from font_fetcher.repo_local import LocalFontRepo
+from font_fetcher.repo_stats import RepoStatsTable
+from font_fetcher.testing import FakeFamilyRepo
+
+
+def test_repo_stats_order(tmp_path):
+    """Test that local repositories are searched first, slow ones later and rarely matching ones are demoted."""
+    fast, slow, rarely_matching, failing = FakeFamilyRepo(), FakeFamilyRepo(), FakeFamilyRepo(), FakeFamilyRepo()
+    local = LocalFontRepo(tmp_path)
+    table = RepoStatsTable()
+    for _ in range(10):
+        table.record_search(fast, 0.1, hit=True)
+        table.record_search(slow, 2.0, hit=True)
+        table.record_search(rarely_matching, 0.1, hit=False)
+        table.record_search(local, 0.1, hit=False)
+        table.record_failure(failing)
+    assert table.get(slow).latency == 2.0 and table.get(fast).hit_rate == 1.0
+    assert table.order([rarely_matching, failing, slow, local, fast]) == ([local], [fast, slow],
+                                                                          [rarely_matching, failing])
+    assert table.order([FakeFamilyRepo()])[2] == [], "Repositories without statistics should not be demoted"
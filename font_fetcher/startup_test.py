@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from font_fetcher.testing import prepare_cache, run_cache_hit_process
+
+
+def test_cache_hit_does_not_load_network_modules(tmp_path: Path):
+    """Test that a process that only gets cache hits does not import the network dependencies."""
+    prepare_cache(tmp_path)
+    result = run_cache_hit_process(tmp_path)
+    assert result["path"].endswith("Bench Sans-Regular.ttf")
+    assert result["network_modules"] == []
+
+
+def test_repo_registry_alias():
+    """Test that the lazily imported registry is the same list under all of its names, whatever is imported first."""
+    from font_fetcher.repo_registry import repo_registry
+    import font_fetcher
+    from font_fetcher import repo_registry as package_registry
+
+    assert repo_registry is font_fetcher._repo_registry()
+    assert font_fetcher.repo_registry is repo_registry, "Importing the legacy module should not shadow the registry"
+    assert package_registry is repo_registry
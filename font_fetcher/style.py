@@ -0,0 +1,184 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Sequence, Tuple
+
+# Lower-case words that may appear in style names (also as prefixes of other words, e.g., "Extra" + "Bold")
+_STYLE_WORDS = {
+    "thin", "hairline", "extra", "ultra", "semi", "demi", "light", "regular", "normal", "book", "roman", "medium", "bold",
+    "black", "heavy", "italic", "oblique", "condensed", "expanded", "narrow", "wide", "variable", "vf",
+    "extralight", "ultralight", "semibold", "demibold", "extrabold", "ultrabold", "extrablack", "ultrablack",
+}
+
+# Weight and width classes of the words of style names (with "extra", "ultra", "semi" and "demi" prefixes joined)
+_WEIGHTS = {
+    "thin": 100, "hairline": 100, "extralight": 200, "ultralight": 200, "light": 300, "regular": 400, "normal": 400,
+    "book": 400, "roman": 400, "medium": 500, "semibold": 600, "demibold": 600, "bold": 700, "extrabold": 800,
+    "ultrabold": 800, "black": 900, "heavy": 900, "extrablack": 950, "ultrablack": 950,
+}
+_WIDTHS = {
+    "ultracondensed": 1, "extracondensed": 2, "condensed": 3, "cond": 3, "narrow": 3, "semicondensed": 4,
+    "semiexpanded": 6, "expanded": 7, "wide": 7, "extraexpanded": 8, "ultraexpanded": 9,
+}
+_WIDTH_PERCENTS = {50: 1, 62: 2, 75: 3, 87: 4, 100: 5, 112: 6, 125: 7, 150: 8, 200: 9}  # Of the OS/2 width classes
+_PREFIXES = {"extra", "ultra", "semi", "demi"}
+_ITALICS = {"italic", "oblique", "it", "ital"}
+_WEIGHT_NAMES = {100: "Thin", 200: "Extra Light", 300: "Light", 400: "Regular", 500: "Medium", 600: "Semi Bold",
+                 700: "Bold", 800: "Extra Bold", 900: "Black"}
+
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def split_words(text: str) -> List[str]:
+    """Splits a name into words, also at camelCase boundaries (e.g., "BoldItalic" -> ["Bold", "Italic"])."""
+    return _TOKEN_RE.findall(text)
+
+
+def _is_style_word(token: str) -> bool:
+    return token.lower() in _STYLE_WORDS or token.isdigit()
+
+
+def style_from_filename(stem: str) -> str:
+    """Guesses the style of a font file from its name (without extension), e.g., "OpenSans-BoldItalic" -> "Bold Italic".
+
+    Font files are usually named "<Family>-<Style>", otherwise the trailing style words are used. Plain family names
+    resolve to "Regular"."""
+    if "-" in stem:
+        tokens = split_words(stem.rsplit("-", 1)[1])
+    else:
+        tokens = split_words(stem)
+        first_style_token = len(tokens)
+        while first_style_token > 0 and _is_style_word(tokens[first_style_token - 1]):
+            first_style_token -= 1
+        tokens = tokens[first_style_token:]
+    tokens = [token.capitalize() if not token.isupper() else token for token in tokens]
+    if len(tokens) > 1:
+        tokens = [token for token in tokens if token.lower() not in {"regular", "normal", "roman", "book"}] or tokens
+    return " ".join(tokens) or "Regular"
+
+
+@dataclass(frozen=True)
+class StyleDescriptor:
+    """The weight class of the style (e.g., 700 for "Bold")."""
+    weight: int = 400
+
+    """The width class of the style, from 1 (ultra-condensed) to 9 (ultra-expanded), 5 being normal."""
+    width: int = 5
+
+    """Whether the style is italic (or oblique)."""
+    italic: bool = False
+
+    """The other (lower-case) words of the style name, e.g., "display" or "mono"."""
+    words: FrozenSet[str] = frozenset()
+
+
+def describe_style(style: str) -> StyleDescriptor:
+    """Parses a style name into its weight, width and slant, understanding weight and width names (also abbreviated or
+    joined, e.g., "SemiBold" or "BoldCond"), weight numbers (e.g., "600" or "wght600"), width percentages (e.g.,
+    "wdth75") and italic or oblique styles. The last weight and width found win."""
+    tokens = [token.lower() for token in split_words(style)]
+    weight, width, italic, words = 400, 5, False, set()
+    i = 0
+    while i < len(tokens):
+        token, joined = tokens[i], "".join(tokens[i:i + 2])
+        if token in _PREFIXES and (joined in _WEIGHTS or joined in _WIDTHS):
+            weight, width = _WEIGHTS.get(joined, weight), _WIDTHS.get(joined, width)
+            i += 1
+        elif token in _WEIGHTS:
+            weight = _WEIGHTS[token]
+        elif token in _WIDTHS:
+            width = _WIDTHS[token]
+        elif token in _ITALICS:
+            italic = True
+        elif token in {"wght", "wdth"} and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+            if token == "wght":
+                weight = int(tokens[i + 1])
+            else:
+                percent = min(_WIDTH_PERCENTS, key=lambda known: abs(known - int(tokens[i + 1])))
+                width = _WIDTH_PERCENTS[percent]
+            i += 1
+        elif token.isdigit() and 100 <= int(token) <= 1000:
+            weight = int(token)
+        else:
+            words.add(token)
+        i += 1
+    return StyleDescriptor(weight=weight, width=width, italic=italic, words=frozenset(words))
+
+
+def style_traits(style: str) -> Tuple[int, bool]:
+    """Returns the weight class (e.g., 700 for "Bold") and whether a style name is italic (or oblique)."""
+    descriptor = describe_style(style)
+    return descriptor.weight, descriptor.italic
+
+
+def style_from_traits(weight: int, italic: bool) -> str:
+    """Returns the usual style name of a weight class and italic flag (e.g., "Semi Bold Italic")."""
+    name = _WEIGHT_NAMES[min(_WEIGHT_NAMES, key=lambda named_weight: abs(named_weight - weight))]
+    if italic:
+        return "Italic" if name == "Regular" else f"{name} Italic"
+    return name
+
+
+def _normalize(style: str) -> str:
+    return "".join(split_words(style)).lower()
+
+
+def _weight_rank(wanted: int, weight: int) -> Tuple[int, int]:
+    """Ranks a weight by its distance to the wanted one, breaking ties as CSS font matching does (e.g., 500 before 300
+    for 400, but lighter weights first for light ones and heavier weights first for bold ones)."""
+    diff = weight - wanted
+    if 400 <= wanted <= 500 and 0 <= diff and weight <= 500:
+        direction = 0
+    elif wanted <= 500:
+        direction = 1 if diff < 0 else 2
+    else:
+        direction = 1 if diff > 0 else 2
+    return abs(diff), direction
+
+
+class StyleIndex:
+    """Precomputed descriptors (see describe_style) of a set of available styles, to rank them against wanted styles.
+
+    Styles are ranked by exact name (ignoring case and spacing), then slant, width, weight (see _weight_rank) and the
+    other words of their names, and finally by their order, so that results are deterministic."""
+
+    def __init__(self, styles: Sequence[str]):
+        self.styles = list(styles)
+        self._normalized = {}
+        for i, style in enumerate(self.styles):
+            self._normalized.setdefault(_normalize(style), i)
+        self._descriptors = [describe_style(style) for style in self.styles]
+
+    def _key(self, wanted: StyleDescriptor, i: int):
+        descriptor = self._descriptors[i]
+        return (descriptor.italic != wanted.italic, abs(descriptor.width - wanted.width),
+                _weight_rank(wanted.weight, descriptor.weight), len(descriptor.words ^ wanted.words), i)
+
+    def rank(self, style: str) -> List[str]:
+        """Returns all the available styles, from the best to the worst match of the wanted style."""
+        wanted = describe_style(style)
+        order = sorted(range(len(self.styles)), key=lambda i: self._key(wanted, i))
+        exact = self._normalized.get(_normalize(style))
+        if exact is not None:
+            order.remove(exact)
+            order.insert(0, exact)
+        return [self.styles[i] for i in order]
+
+    def best(self, style: str) -> str:
+        """Returns the available style that best matches the wanted style."""
+        exact = self._normalized.get(_normalize(style))
+        if exact is not None:
+            return self.styles[exact]
+        wanted = describe_style(style)
+        return self.styles[min(range(len(self.styles)), key=lambda i: self._key(wanted, i))]
+
+
+@lru_cache(maxsize=256)
+def _style_index(styles: Tuple[str, ...]) -> StyleIndex:
+    return StyleIndex(styles)
+
+
+def match_style(style: str, available_styles: List[str]) -> str:
+    """Returns the available style that best matches the wanted style (see StyleIndex, which is built once per set of
+    available styles)."""
+    return _style_index(tuple(available_styles)).best(style)
@@ -0,0 +1,34 @@
+import pytest
+
+from font_fetcher.style import StyleDescriptor, StyleIndex, describe_style, match_style
+
+
+def test_describe_style():
+    """Test that weight, width and slant names, numbers and abbreviations are understood."""
+    assert describe_style("SemiBold") == describe_style("600") == describe_style("wght600") == StyleDescriptor(600)
+    assert describe_style("BoldIt") == describe_style("bold oblique") == StyleDescriptor(700, italic=True)
+    assert describe_style("ExtraBoldCond") == StyleDescriptor(800, width=3)
+    assert describe_style("wdth75 wght300") == StyleDescriptor(300, width=3)
+    assert describe_style("Display Black") == StyleDescriptor(900, words=frozenset({"display"}))
+
+
+@pytest.mark.parametrize("wanted, available, expected", [
+    ("Bold Italic", ["Regular", "Bold", "Italic", "Bold Italic"], "Bold Italic"),
+    ("bold italic", ["Bold", "BoldItalic"], "BoldItalic"),
+    ("Bold Italic", ["Bold", "SemiBold Italic", "Black Italic"], "SemiBold Italic"),
+    ("SemiBold", ["Regular", "600", "Bold"], "600"),
+    ("Regular", ["Light", "Medium"], "Medium"),
+    ("Light", ["Extra Light", "Regular"], "Extra Light"),
+    ("Bold", ["Condensed Bold", "Black"], "Black"),
+    ("Condensed", ["Regular", "Condensed Regular", "Condensed Bold"], "Condensed Regular"),
+])
+def test_match_style(wanted: str, available: list, expected: str):
+    """Test that the closest style is chosen: same slant first, then width, then weight (ties as in CSS)."""
+    assert match_style(wanted, available) == expected
+
+
+def test_style_index_rank():
+    """Test that ranking is deterministic, keeping the order of the available styles for ties."""
+    index = StyleIndex(["Bold", "Regular", "Medium", "Italic", "Light"])
+    assert index.rank("Regular") == ["Regular", "Medium", "Light", "Bold", "Italic"]
+    assert index.rank("SemiBold") == ["Bold", "Medium", "Regular", "Light", "Italic"]
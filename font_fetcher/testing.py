@@ -0,0 +1,305 @@
+import hashlib
+import html
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from font_fetcher.repo import Font, FontRepo
+
+DEFAULT_STYLES = ["Regular", "Bold", "Italic", "BoldItalic"]
+
+# Unrelated files that real archives contain, to make extraction realistic
+_EXTRA_MEMBERS = {
+    "specimen.pdf": 256 * 1024,
+    "preview.png": 128 * 1024,
+    "license/OFL.txt": 4 * 1024,
+}
+
+
+def make_font_bytes(family: str, style: str, size: int = 64 * 1024) -> bytes:
+    """Returns the contents of a synthetic font file (not a valid font, but of a realistic size)."""
+    header = f"FAKEFONT {family} {style}\n".encode()
+    return header + bytes(i % 251 for i in range(size - len(header)))
+
+
+def _slug(family: str) -> str:
+    return family.lower().replace(" ", "-")
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+def _file_stem(family: str) -> str:
+    return family.replace(" ", "")
+
+
+def make_font(names: Dict[int, str], weight: int, fs_selection: int) -> bytes:
+    """Builds a minimal OpenType font with only name and OS/2 tables."""
+    strings = b"".join(name.encode("utf-16-be") for name in names.values())
+    records, offset = b"", 0
+    for name_id, name in names.items():
+        length = len(name.encode("utf-16-be"))
+        records += struct.pack(">6H", 3, 1, 0x409, name_id, length, offset)
+        offset += length
+    name_table = struct.pack(">3H", 0, len(names), 6 + len(records)) + records + strings
+    os2_table = struct.pack(">HhH", 4, 500, weight) + b"\0" * 56 + struct.pack(">H", fs_selection) + b"\0" * 34
+    tables = {b"OS/2": os2_table, b"name": name_table}
+    data_offset = 12 + 16 * len(tables)
+    directory, data = b"", b""
+    for tag, table in tables.items():
+        directory += struct.pack(">4sIII", tag, 0, data_offset + len(data), len(table))
+        data += table + b"\0" * (-len(table) % 4)
+    return b"OTTO" + struct.pack(">4H", len(tables), 0, 0, 0) + directory + data
+
+
+def make_archive(family: str, styles: List[str], archive_format: str = "zip") -> bytes:
+    """Builds a synthetic font archive ("zip" or "tar.gz") like the ones served by font repositories."""
+    members = {f"{family}/{_file_stem(family)}-{style}.ttf": make_font_bytes(family, style) for style in styles}
+    members.update({f"{family}/{name}": b"\0" * size for name, size in _EXTRA_MEMBERS.items()})
+    buffer = io.BytesIO()
+    if archive_format == "zip":
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for name, data in members.items():
+                zip_file.writestr(name, data)
+    else:
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar_file:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_file.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def make_search_page(results: List[str], archive_format: str = "zip", filler_items: int = 10) -> str:
+    """Builds a search results page with the same markup as 1001fonts (.font-list-item elements)."""
+    items = []
+    for family in results + [f"Unrelated Filler {i}" for i in range(filler_items)]:
+        items.append(f"""
+        <div class="font-list-item">
+          <div class="font-toolbar">
+            <a class="btn btn-default" href="/{_slug(family)}-font.html">Details</a>
+            <a class="btn btn-primary btn-download" href="/download/{_slug(family)}.{archive_format}">Download</a>
+          </div>
+          <h2 class="font-title"><a href="/{_slug(family)}-font.html">{html.escape(family)}</a>
+            <span class="font-author">by <a href="/users/someone/">Someone</a></span></h2>
+          <div class="font-preview"><img src="/images/{_slug(family)}.png" alt="{html.escape(family)} preview"></div>
+          <ul class="font-tags"><li>sans-serif</li><li>free for commercial use</li></ul>
+        </div>""")
+    return f"""<!DOCTYPE html>
+<html><head><title>Search results</title></head>
+<body>
+  <nav><ul>{"".join(f'<li><a href="/category-{i}.html">Category {i}</a></li>' for i in range(50))}</ul></nav>
+  <div class="font-list">{"".join(items)}
+  </div>
+  <footer>{"<p>Footer text</p>" * 20}</footer>
+</body></html>"""
+
+
+class FakeFamilyRepo(FontRepo):
+    """Repository serving a single family with several styles without any network access, counting the searches and
+    downloads. Searches for "Fake Sans" are answered with the given family name (after the given delay)."""
+
+    def __init__(self, family: Optional[str] = "Fake Sans", delay: float = 0.0):
+        self.family = family
+        self.delay = delay
+        self.searches = 0
+        self.downloads = 0
+
+    @property
+    def identity(self) -> str:
+        return f"{self.__class__.__name__}({self.family!r}, delay={self.delay})"
+
+    def search_font(self, font_name: str) -> List[Font]:
+        if self.delay:
+            time.sleep(self.delay)
+        self.searches += 1
+        return [Font(name=self.family)] if self.family is not None and font_name.lower() == "fake sans" else []
+
+    def download_font(self, out_dir: Path, font: Font, style: str = "Regular") -> Path:
+        raise AssertionError("Whole families should be downloaded")
+
+    def download_font_family(self, out_dir: Path, font: Font) -> List[Path]:
+        self.downloads += 1
+        paths = []
+        for style in DEFAULT_STYLES:
+            path = out_dir / f"FakeSans-{style}.ttf"
+            path.write_bytes(style.encode())
+            paths.append(path)
+        return paths
+
+
+class FakeFontRepoServer:
+    """Local HTTP server mimicking the 1001fonts search and download endpoints, serving synthetic search pages and font
+    archives without any network access, so that fetching can be benchmarked and tested offline.
+
+    Use it as a context manager, and point a Fonts1001Repo to it with configure_repo. Every request is delayed by
+    latency seconds, to simulate the network. With validators, responses have an ETag (and a Last-Modified header), and
+    conditional requests for unchanged responses are answered with 304 Not Modified. Archives support Range requests,
+    and the first archive downloads (as many as interruptions) are cut after interrupt_after bytes, to simulate
+    unreliable networks."""
+
+    def __init__(self, families: Optional[Dict[str, List[str]]] = None, archive_format: str = "zip",
+                 latency: float = 0.0, validators: bool = False, interruptions: int = 0, interrupt_after: int = 0):
+        self.families = families if families is not None else {"Fake Sans": DEFAULT_STYLES}
+        self.archive_format = archive_format
+        self.latency = latency
+        self.validators = validators
+        self.not_modified = 0
+        self.interruptions = interruptions
+        self.interrupt_after = interrupt_after
+        self.ranges: List[str] = []
+        self.requests: List[str] = []
+        self._archives: Dict[str, bytes] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def configure_repo(self, repo):
+        """Points a Fonts1001Repo to this server."""
+        repo.search_url = self.base_url + "/search.html"
+        repo.search_url_prefix = ""
+        return repo
+
+    def _search(self, query: str) -> List[str]:
+        words = query.lower().split()
+        return [family for family in self.families if all(word in family.lower() for word in words)]
+
+    def update_family(self, family: str, styles: List[str]):
+        """Changes the styles of a family, so that its archive (and its validators) change."""
+        self.families[family] = styles
+        self._archives.pop(_slug(family), None)
+
+    def _archive(self, slug: str) -> Optional[bytes]:
+        for family, styles in self.families.items():
+            if _slug(family) == slug:
+                if slug not in self._archives:
+                    self._archives[slug] = make_archive(family, styles, self.archive_format)
+                return self._archives[slug]
+        return None
+
+    def __enter__(self) -> "FakeFontRepoServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                if url.path == "/search.html":
+                    query = parse_qs(url.query).get("search", [""])[0]
+                    body = make_search_page(server._search(query), server.archive_format).encode()
+                    self._respond(200, "text/html; charset=utf-8", body)
+                elif url.path.startswith("/download/"):
+                    slug = url.path[len("/download/"):].split(".", 1)[0]
+                    body = server._archive(slug)
+                    mime = "application/zip" if server.archive_format == "zip" else "application/gzip"
+                    if body is None:
+                        self._respond(404, "text/plain", b"Not found")
+                    else:
+                        self._respond_archive(mime, body)
+                else:
+                    self._respond(404, "text/plain", b"Not found")
+
+            def _respond_archive(self, mime: str, body: bytes):
+                range_header = self.headers.get("Range", "")
+                if range_header.startswith("bytes=") and self.headers.get("If-Range") == _etag(body):
+                    server.ranges.append(range_header)
+                    start = int(range_header[len("bytes="):].split("-", 1)[0])
+                    self.send_response(206)
+                    self.send_header("Content-Type", mime)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                    self.send_header("Content-Length", str(len(body) - start))
+                    self.end_headers()
+                    self.wfile.write(body[start:])
+                elif server.interruptions > 0:
+                    server.interruptions -= 1
+                    self._respond(200, mime, body, ranges=True, cut_after=server.interrupt_after)
+                else:
+                    self._respond(200, mime, body, ranges=True)
+
+            def _respond(self, status: int, mime: str, body: bytes, ranges: bool = False,
+                         cut_after: Optional[int] = None):
+                if server.validators and status == 200:
+                    etag = _etag(body)
+                    if self.headers.get("If-None-Match") == etag:
+                        server.not_modified += 1
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(status)
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", "Mon, 05 Oct 2026 12:00:00 GMT")
+                else:
+                    self.send_response(status)
+                self.send_header("Content-Type", mime)
+                self.send_header("Content-Length", str(len(body)))
+                if ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+                if cut_after is None:
+                    self.wfile.write(body)
+                else:  # The client sees a truncated body
+                    self.wfile.write(body[:cut_after])
+                    self.wfile.flush()
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass  # Quiet
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_CACHE_HIT_CHILD = """
+import sys, time
+start = time.perf_counter()
+import font_fetcher
+path = font_fetcher.fetch_font("Bench Sans", "Regular")
+elapsed = time.perf_counter() - start
+network_modules = sorted(m for m in ("requests", "bs4", "urllib3", "httpx") if m in sys.modules)
+print(__import__("json").dumps({"elapsed": elapsed, "path": str(path), "network_modules": network_modules}))
+"""
+
+
+def run_cache_hit_process(home: Path) -> dict:
+    """Runs a fresh interpreter that fetches a cached font, returning its timings and loaded network modules."""
+    env = dict(os.environ, HOME=str(home), LOCALAPPDATA=str(home), PYTHONPATH=str(_REPO_ROOT))
+    output = subprocess.run([sys.executable, "-c", _CACHE_HIT_CHILD], env=env, check=True, capture_output=True,
+                            text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def prepare_cache(home: Path):
+    """Creates a cache directory (in the given home directory) containing a single font."""
+    env = dict(os.environ, HOME=str(home), LOCALAPPDATA=str(home), PYTHONPATH=str(_REPO_ROOT))
+    cache_dir = subprocess.run([sys.executable, "-c", "import font_fetcher; print(font_fetcher._CACHE_DIR)"],
+                               env=env, check=True, capture_output=True, text=True).stdout.strip()
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    (Path(cache_dir) / "Bench Sans-Regular.ttf").write_bytes(b"\0" * 1024)